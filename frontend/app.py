@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 
+import json
 import os
 
 BACKEND_URL = os.getenv(
@@ -8,6 +9,17 @@ BACKEND_URL = os.getenv(
     "http://127.0.0.1:8000/rag/stream"
 )
 
+
+def error_detail(response: requests.Response) -> str:
+    """
+    Message of a non-200 backend response (FastAPI sends {"detail": ...}).
+    """
+    try:
+        return response.json().get("detail", response.text)
+    except ValueError:
+        return response.text
+
+
 st.set_page_config(page_title="MedWise RAG", layout="wide")
 st.title("🩺 MedWise Medical Assistant")
 
@@ -34,6 +46,7 @@ if prompt:
         metrics_placeholder = st.empty()
 
         full_response = ""
+        sources = []
         metrics = None
 
         with requests.get(
@@ -42,25 +55,41 @@ if prompt:
             stream=True,
             timeout=300,
         ) as r:
-            for line in r.iter_lines(decode_unicode=True):
-                if not line:
-                    continue
+            if not r.ok:
+                # 503 when the server is saturated, 400 for a bad request
+                st.error(f"Backend error ({r.status_code}): {error_detail(r)}")
+            else:
+                # One JSON object per line: sources, token..., metrics, done
+                for line in r.iter_lines(decode_unicode=True):
+                    if not line:
+                        continue
+
+                    event = json.loads(line)
 
-                if line.strip() == "<END>":
-                    metrics = next(r.iter_lines(decode_unicode=True))
-                    break
+                    if event["type"] == "token":
+                        full_response += event["text"]
+                        response_placeholder.markdown(full_response)
+                    elif event["type"] == "sources":
+                        sources = event["sources"]
+                    elif event["type"] == "metrics":
+                        metrics = event
+                    elif event["type"] == "error":
+                        st.error(event["message"])
+                    elif event["type"] == "done":
+                        break
 
-                full_response += line
-                response_placeholder.markdown(full_response)
+        pages = sorted({s["page"] for s in sources if s.get("page") is not None})
+        if pages:
+            st.caption("Sources: " + ", ".join(f"Page {page}" for page in pages))
 
         if metrics:
-            stats = eval(metrics)
             metrics_placeholder.markdown(
                 f"""
 **⏱ Performance**
-- Retrieval time: `{stats['retrieval_time']}s`
-- LLM generation time: `{stats['llm_time']}s`
-- End-to-end time: `{stats['e2e_time']}s`
+- Retrieval time: `{metrics.get('retrieval_time', 0)}s`
+- Time to first token: `{metrics['time_to_first_token']}s`
+- LLM generation time: `{metrics.get('llm_time', 0)}s` ({metrics['tokens']} tokens)
+- End-to-end time: `{metrics['e2e_time']}s`
 """
             )
 
@@ -1,16 +1,32 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 import asyncio
 import logging
 from pathlib import Path
+from typing import List, Optional
 
+from pydantic import BaseModel
+
+from src.api.streaming import (
+    MEDIA_TYPES,
+    ClosingStreamingResponse,
+    coalesce,
+    encode_event,
+)
+from src.core import metrics
 from src.core.logging_config import setup_logging
 from src.core.config import load_production_config
+from src.retrieval.batcher import QueryEmbeddingBatcher
+from src.retrieval.executor import RetrievalExecutor
 from src.retrieval.retriever import VectorRetriever
-from src.rag.chain import RAGChain
+from src.rag.cache import SemanticAnswerCache
+from src.rag.chain import OLLAMA_BASE_URL, USE_DUMMY_LLM, RAGChain, timing_report
+from src.rag.context import ContextPacker
+from src.rag.gateway import OllamaGateway
+from src.rag.singleflight import SingleFlight
+from src.retrieval.result_cache import normalize_query
 import time
-import json
 
 # ---------------------------------------------------------------------
 # Logging
@@ -35,23 +51,86 @@ async def lifespan(app: FastAPI):
 
     config = load_production_config()
 
-    retriever = VectorRetriever(
+    retriever = VectorRetriever.from_config(
+        config["retrieval"],
         vectorstore_dir=VECTORSTORE_DIR,
         model_name="sentence-transformers/all-MiniLM-L6-v2",
-        k=config["retrieval"]["k"],
-        strategy=config["retrieval"]["strategy"],
     )
 
-    rag_chain = RAGChain(retriever)
+    api_config = config.get("api", {})
+    executor = RetrievalExecutor(
+        max_workers=api_config.get("retrieval_workers", 4),
+        max_pending=api_config.get("retrieval_max_pending", 32),
+    )
+
+    batcher = None
+    if api_config.get("embedding_batching", False):
+        batcher = QueryEmbeddingBatcher(
+            retriever.embeddings,
+            max_batch_size=api_config.get("embedding_max_batch_size", 16),
+            max_wait_ms=api_config.get("embedding_max_wait_ms", 5.0),
+            executor=executor,
+        )
+
+    answer_cache = None
+    cache_config = config.get("cache", {})
+    if cache_config.get("enabled", False):
+        answer_cache = SemanticAnswerCache(
+            similarity_threshold=cache_config.get("similarity_threshold", 0.95),
+            max_entries=cache_config.get("max_entries", 1024),
+            ttl_seconds=cache_config.get("ttl_seconds", 3600),
+            max_bytes=cache_config.get("max_mb", 64) * 1024 * 1024,
+        )
+
+    context_packer = None
+    llm_config = config.get("llm", {})
+    if llm_config.get("context_packing", False):
+        context_packer = ContextPacker(
+            num_ctx=llm_config.get("num_ctx", 2048),
+            num_predict=llm_config.get("num_predict", 256),
+        )
+
+    gateway = None
+    gateway_config = llm_config.get("gateway", {})
+    if gateway_config.get("enabled", False) and not USE_DUMMY_LLM:
+        gateway = OllamaGateway(
+            base_url=OLLAMA_BASE_URL,
+            model=llm_config.get("model", "llama3.2"),
+            max_concurrent=gateway_config.get("max_concurrent", 2),
+            max_queue=gateway_config.get("max_queue", 64),
+            queue_timeout=gateway_config.get("queue_timeout_s", 30.0),
+            options={
+                "temperature": llm_config.get("temperature", 0.1),
+                "num_ctx": llm_config.get("num_ctx", 2048),
+                "num_predict": llm_config.get("num_predict", 256),
+            },
+        )
+
+    rag_chain = RAGChain(
+        retriever,
+        executor=executor,
+        batcher=batcher,
+        answer_cache=answer_cache,
+        context_packer=context_packer,
+        gateway=gateway,
+        llm_config=llm_config,
+    )
 
     app.state.config = config
     app.state.retriever = retriever
+    app.state.executor = executor
     app.state.rag_chain = rag_chain
+    app.state.single_flight = (
+        SingleFlight() if api_config.get("single_flight", False) else None
+    )
 
     logger.info("Backend startup complete")
 
     yield
 
+    if gateway is not None:
+        await gateway.aclose()
+    executor.shutdown()
     logger.info("Backend shutdown complete")
 
 
@@ -81,48 +160,175 @@ async def readiness_check(request: Request):
     return {"ready": ready}
 
 
+@app.get("/cache/stats")
+async def cache_stats(request: Request):
+    answer_cache = request.app.state.rag_chain.answer_cache
+    if answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **answer_cache.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(
+        metrics.REGISTRY.render(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+# ---------------------------------------------------------------------
+# RAG batch endpoint
+# ---------------------------------------------------------------------
+
+class BatchRequest(BaseModel):
+    questions: List[str]
+
+
+@app.post("/rag/batch")
+async def batch_rag(body: BatchRequest, request: Request):
+    rag_chain: RAGChain = request.app.state.rag_chain
+    executor: RetrievalExecutor = request.app.state.executor
+    api_config = request.app.state.config.get("api", {})
+
+    max_questions = api_config.get("batch_max_questions", 256)
+    if not body.questions:
+        raise HTTPException(status_code=422, detail="No questions given")
+    if len(body.questions) > max_questions:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {max_questions} questions per batch",
+        )
+
+    if executor.saturated:
+        logger.warning("Retrieval pool saturated, rejecting batch")
+        metrics.REQUESTS_REJECTED.inc()
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, retry later",
+            headers={"Retry-After": "1"},
+        )
+
+    t0 = time.perf_counter()
+    timings = {}
+
+    results = await rag_chain.answer_batch(
+        body.questions,
+        concurrency=api_config.get("batch_llm_concurrency", 4),
+        timings=timings,
+    )
+
+    return {
+        "results": results,
+        "timings": {
+            "embedding_time": round(timings["embedding_time"], 3),
+            "search_time": round(timings["search_time"], 3),
+            "llm_time": round(timings["llm_time"], 3),
+            "unique_questions": timings["unique_questions"],
+            "e2e_time": round(time.perf_counter() - t0, 3),
+        },
+    }
+
+
 # ---------------------------------------------------------------------
 # RAG streaming endpoint (async-safe)
 # ---------------------------------------------------------------------
 
 @app.get("/rag/stream")
-async def stream_rag(question: str, request: Request):
+async def stream_rag(question: str, request: Request, format: Optional[str] = None):
     rag_chain: RAGChain = request.app.state.rag_chain
-    retriever = request.app.state.retriever
-
-    async def token_stream():
+    executor: RetrievalExecutor = request.app.state.executor
+    single_flight: Optional[SingleFlight] = getattr(request.app.state, "single_flight", None)
+    api_config = request.app.state.config.get("api", {})
+
+    # Explicit ?format= wins, then the Accept header, then NDJSON
+    stream_format = format
+    if stream_format is None:
+        accept = request.headers.get("accept", "")
+        stream_format = "sse" if "text/event-stream" in accept else "ndjson"
+    if stream_format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {stream_format}")
+
+    # Backpressure: reject before streaming starts so clients get a real 503
+    if executor.saturated:
+        logger.warning("Retrieval pool saturated, rejecting request")
+        metrics.REQUESTS_REJECTED.inc()
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, retry later",
+            headers={"Retry-After": "1"},
+        )
+
+    async def event_stream():
+        """
+        Typed events: sources, token (coalesced), metrics, then done;
+        error replaces metrics when the stream fails.
+        """
+        metrics.STREAMS_IN_FLIGHT.inc()
+        flight = None
+        chunks = None
         try:
             t0 = time.perf_counter()
+            first_token_time = None
+
+            if single_flight is not None:
+                # Identical concurrent questions share one retrieval + generation
+                flight, leader = single_flight.join(
+                    normalize_query(question),
+                    lambda f: rag_chain.stream_answer(question, f.timings, f.sources),
+                )
+                answer = flight.subscribe()
+                timings, sources = flight.timings, flight.sources
+            else:
+                timings, sources = {}, []
+                answer = rag_chain.stream_answer(question, timings, sources)
+
+            chunks = coalesce(
+                answer,
+                flush_ms=api_config.get("stream_flush_ms", 0),
+                flush_bytes=api_config.get("stream_flush_bytes", 0),
+            )
 
-            # ---- Retrieval timing (explicit) ----
-            t_r_start = time.perf_counter()
-            _ = retriever.retrieve(question)
-            t_r_end = time.perf_counter()
-            retrieval_time = t_r_end - t_r_start
+            # ---- Single retrieval (or cache hit), timed by the chain ----
+            async for chunk in chunks:
+                if first_token_time is None:
+                    first_token_time = time.perf_counter() - t0
+                    yield encode_event("sources", {"sources": sources}, stream_format)
+                yield encode_event("token", {"text": chunk.decode("utf-8")}, stream_format)
 
-            # ---- LLM streaming timing ----
-            t_g_start = time.perf_counter()
-            async for chunk in rag_chain.stream_answer(question):
-                yield chunk
-            t_g_end = time.perf_counter()
+            if first_token_time is None:
+                yield encode_event("sources", {"sources": sources}, stream_format)
 
-            llm_time = t_g_end - t_g_start
             e2e_time = time.perf_counter() - t0
-
-            yield "\n<END>\n"
-            yield json.dumps(
-                {
-                    "retrieval_time": round(retrieval_time, 3),
-                    "llm_time": round(llm_time, 3),
-                    "e2e_time": round(e2e_time, 3),
-                }
-            )
-
+            metrics.REQUEST_SECONDS.observe(e2e_time)
+
+            report = timing_report(timings)
+            if flight is not None:
+                report["joined_in_flight"] = not leader
+            report["time_to_first_token"] = round(first_token_time or e2e_time, 3)
+            report["e2e_time"] = round(e2e_time, 3)
+            yield encode_event("metrics", report, stream_format)
+
+        except (asyncio.CancelledError, GeneratorExit):
+            # Client disconnected: the cleanup below aborts retrieval/generation
+            logger.info("Client disconnected, aborting stream")
+            metrics.STREAMS_CANCELLED.inc()
+            raise
         except Exception as e:
             logger.exception("Streaming failed")
-            yield f"\n[ERROR] {str(e)}"
-
-    return StreamingResponse(
-        token_stream(),
-        media_type="text/plain",
+            metrics.REQUEST_ERRORS.inc()
+            yield encode_event("error", {"message": str(e)}, stream_format)
+        finally:
+            if chunks is not None:
+                await chunks.aclose()
+            if flight is not None:
+                single_flight.leave(flight)
+            metrics.STREAMS_IN_FLIGHT.dec()
+
+        yield encode_event("done", {}, stream_format)
+
+    return ClosingStreamingResponse(
+        event_stream(),
+        media_type=MEDIA_TYPES[stream_format],
+        # Stop reverse proxies from buffering SSE
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import time
+from typing import AsyncIterator
+
+from fastapi.responses import StreamingResponse
+
+# ---------------------------------------------------------------------
+# Stream event encoding
+# ---------------------------------------------------------------------
+
+EVENT_TYPES = ("token", "sources", "metrics", "error", "done")
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+
+def encode_event(event: str, payload: dict, stream_format: str = "ndjson") -> bytes:
+    """
+    Encode one typed event as an NDJSON line or an SSE frame.
+    JSON escaping keeps newlines inside tokens from breaking either framing.
+    """
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode("utf-8")
+    return (json.dumps({"type": event, **payload}) + "\n").encode("utf-8")
+
+
+# ---------------------------------------------------------------------
+# Token coalescing
+# ---------------------------------------------------------------------
+
+async def coalesce(
+    chunks: AsyncIterator[bytes],
+    flush_ms: float = 0.0,
+    flush_bytes: int = 0,
+) -> AsyncIterator[bytes]:
+    """
+    Merge small chunks into fewer, larger ones.
+
+    A buffer is flushed once it holds flush_bytes, or flush_ms after its
+    first chunk arrived, whichever comes first, so a slow token never waits
+    on the next one. The first chunk is always sent immediately to keep
+    time-to-first-token unchanged. With both limits at 0 chunks pass through.
+    """
+    if flush_ms <= 0 and flush_bytes <= 0:
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            if hasattr(chunks, "aclose"):
+                await chunks.aclose()
+        return
+
+    iterator = chunks.__aiter__()
+    buffer = bytearray()
+    deadline = None
+    first = True
+    pending = None
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+
+            timeout = None
+            if deadline is not None:
+                timeout = max(deadline - time.perf_counter(), 0.0)
+
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+
+            if not done:
+                # Deadline passed while waiting for the next chunk
+                yield bytes(buffer)
+                buffer.clear()
+                deadline = None
+                continue
+
+            try:
+                chunk = pending.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+
+            if first:
+                first = False
+                yield chunk
+                continue
+
+            buffer.extend(chunk)
+            if deadline is None and flush_ms > 0:
+                deadline = time.perf_counter() + flush_ms / 1000
+
+            if flush_bytes > 0 and len(buffer) >= flush_bytes:
+                yield bytes(buffer)
+                buffer.clear()
+                deadline = None
+
+        if buffer:
+            yield bytes(buffer)
+    finally:
+        if pending is not None:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+
+
+# ---------------------------------------------------------------------
+# Response
+# ---------------------------------------------------------------------
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that closes its body generator when the response ends
+    for any reason. On a client disconnect the generator may be parked at a
+    `yield`; closing it runs its cleanup (cancelling the LLM stream) now
+    rather than whenever it is garbage collected.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if hasattr(self.body_iterator, "aclose"):
+                await self.body_iterator.aclose()
@@ -0,0 +1,179 @@
+import bisect
+import math
+import threading
+from typing import List, Sequence
+
+# ---------------------------------------------------------------------
+# Minimal Prometheus text-format metrics (no client library dependency)
+# ---------------------------------------------------------------------
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+THROUGHPUT_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 200)
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+            f"{self.name} {_format(self._value)}",
+        ]
+
+
+class Gauge(Counter):
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {_format(self._value)}",
+        ]
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        """
+        Fixed-bucket histogram. observe() is a bisect plus two additions
+        under a lock, cheap enough for the request hot path.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def render(self) -> List[str]:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+            cumulative += bucket_count
+            lines.append(f'{self.name}_bucket{{le="{_format(bound)}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {_format(total)}")
+        lines.append(f"{self.name}_count {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ---------------------------------------------------------------------
+# Request pipeline metrics
+# ---------------------------------------------------------------------
+
+EMBEDDING_SECONDS = REGISTRY.register(Histogram(
+    "medwise_embedding_seconds", "Query embedding time",
+))
+SEARCH_SECONDS = REGISTRY.register(Histogram(
+    "medwise_vector_search_seconds", "Vector search time per query",
+))
+PROMPT_SECONDS = REGISTRY.register(Histogram(
+    "medwise_prompt_build_seconds", "Prompt assembly time",
+))
+TTFT_SECONDS = REGISTRY.register(Histogram(
+    "medwise_time_to_first_token_seconds", "Time from LLM call to first streamed token",
+))
+TOKENS_PER_SECOND = REGISTRY.register(Histogram(
+    "medwise_generation_tokens_per_second", "Streamed tokens per second after the first token",
+    buckets=THROUGHPUT_BUCKETS,
+))
+LLM_QUEUE_SECONDS = REGISTRY.register(Histogram(
+    "medwise_llm_queue_seconds", "Wait for a free LLM generation slot",
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "medwise_request_seconds", "End-to-end /rag/stream latency",
+))
+
+RETRIEVAL_CACHE_HITS = REGISTRY.register(Counter(
+    "medwise_retrieval_cache_hits_total", "Retrievals served from the result cache",
+))
+ANSWER_CACHE_HITS = REGISTRY.register(Counter(
+    "medwise_answer_cache_hits_total", "Answers served from the semantic cache",
+))
+ANSWER_CACHE_MISSES = REGISTRY.register(Counter(
+    "medwise_answer_cache_misses_total", "Semantic cache lookups that missed",
+))
+SINGLEFLIGHT_FOLLOWERS = REGISTRY.register(Counter(
+    "medwise_singleflight_followers_total", "Streams served by joining an identical in-flight request",
+))
+CONTEXT_TOKENS_SAVED = REGISTRY.register(Counter(
+    "medwise_context_tokens_saved_total", "Prompt tokens removed by context packing",
+))
+LLM_QUEUE_REJECTED = REGISTRY.register(Counter(
+    "medwise_llm_queue_rejected_total", "Generations refused by a full or timed-out LLM queue",
+))
+GENERATIONS_CANCELLED = REGISTRY.register(Counter(
+    "medwise_generations_cancelled_total", "LLM generations aborted because the client went away",
+))
+TOKENS_SAVED = REGISTRY.register(Counter(
+    "medwise_generation_tokens_saved_total", "Upper-bound estimate of tokens not generated thanks to aborts",
+))
+STREAMS_CANCELLED = REGISTRY.register(Counter(
+    "medwise_streams_cancelled_total", "Streams whose client disconnected before completion",
+))
+REQUEST_ERRORS = REGISTRY.register(Counter(
+    "medwise_request_errors_total", "Streams that failed with an exception",
+))
+REQUESTS_REJECTED = REGISTRY.register(Counter(
+    "medwise_requests_rejected_total", "Requests rejected with 503 by backpressure",
+))
+STREAMS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "medwise_streams_in_flight", "Streams currently being served",
+))
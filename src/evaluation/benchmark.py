@@ -0,0 +1,253 @@
+import argparse
+import asyncio
+import json
+import logging
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+import httpx
+import numpy as np
+
+from src.core.config import load_production_config
+from src.core.logging_config import setup_logging
+from src.retrieval.retriever import VectorRetriever
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# One INFO line per request would drown the report
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+VECTORSTORE_DIR = Path("data/vectorstore")
+EVAL_QUESTIONS_PATH = Path("data/eval/questions.json")
+BENCHMARKS_DIR = Path("data/benchmarks")
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+# ---------------------------
+# Statistics
+# ---------------------------
+def latency_stats(latencies: List[float]) -> dict:
+    """
+    Percentiles of a list of latencies in seconds, reported in ms.
+    """
+    if not latencies:
+        return {}
+
+    latencies_ms = np.asarray(latencies) * 1000
+    p50, p90, p99 = np.percentile(latencies_ms, [50, 90, 99])
+    return {
+        "p50_ms": float(p50),
+        "p90_ms": float(p90),
+        "p99_ms": float(p99),
+        "mean_ms": float(latencies_ms.mean()),
+        "max_ms": float(latencies_ms.max()),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# ---------------------------
+# Retriever benchmark
+# ---------------------------
+def benchmark_retriever(
+    retriever: VectorRetriever,
+    questions: List[str],
+    concurrency: int,
+    repeats: int,
+) -> dict:
+    """
+    Replay questions through retriever.retrieve (embedding + search)
+    from `concurrency` threads.
+    """
+    # Warm-up so model and index loading are not counted
+    retriever.retrieve(questions[0])
+
+    workload = questions * repeats
+
+    def timed(question: str) -> float:
+        t_start = time.perf_counter()
+        retriever.retrieve(question)
+        return time.perf_counter() - t_start
+
+    t_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed, workload))
+    wall_time = time.perf_counter() - t_start
+
+    return {
+        "requests": len(workload),
+        "concurrency": concurrency,
+        "throughput_rps": len(workload) / wall_time,
+        "latency": latency_stats(latencies),
+    }
+
+
+# ---------------------------
+# End-to-end streaming benchmark
+# ---------------------------
+async def _stream_once(client: httpx.AsyncClient, question: str) -> Optional[dict]:
+    t_start = time.perf_counter()
+    ttft = None
+
+    async with client.stream("GET", "/rag/stream", params={"question": question}) as response:
+        if response.status_code != 200:
+            return None
+
+        async for chunk in response.aiter_bytes():
+            if ttft is None and chunk:
+                ttft = time.perf_counter() - t_start
+
+    return {"ttft": ttft, "total": time.perf_counter() - t_start}
+
+
+async def benchmark_stream(
+    base_url: str,
+    questions: List[str],
+    concurrency: int,
+    repeats: int,
+) -> dict:
+    """
+    Replay questions against a running /rag/stream endpoint with at most
+    `concurrency` requests in flight. Time-to-first-token is the arrival
+    of the first body byte.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+        # Warm-up request, not counted
+        await _stream_once(client, questions[0])
+
+        async def run(question: str) -> Optional[dict]:
+            async with semaphore:
+                return await _stream_once(client, question)
+
+        workload = questions * repeats
+
+        t_start = time.perf_counter()
+        results = await asyncio.gather(*(run(q) for q in workload))
+        wall_time = time.perf_counter() - t_start
+
+    completed = [r for r in results if r is not None]
+    return {
+        "requests": len(workload),
+        "rejected": len(workload) - len(completed),
+        "concurrency": concurrency,
+        "throughput_rps": len(completed) / wall_time,
+        "latency": latency_stats([r["total"] for r in completed]),
+        "ttft": latency_stats([r["ttft"] for r in completed if r["ttft"] is not None]),
+    }
+
+
+# ---------------------------
+# Comparison
+# ---------------------------
+def compare(current: dict, baseline: dict) -> None:
+    """
+    Log percentage change of every percentile shared by two result files.
+    """
+    for target, stats in current["results"].items():
+        base_stats = baseline.get("results", {}).get(target)
+        if not base_stats:
+            continue
+
+        for group in ("latency", "ttft"):
+            for name, value in stats.get(group, {}).items():
+                base_value = base_stats.get(group, {}).get(name)
+                if not base_value:
+                    continue
+                change = 100 * (value - base_value) / base_value
+                logger.info(
+                    f"{target:>9} {group:>7} {name:>7}: {base_value:9.2f} -> "
+                    f"{value:9.2f} ({change:+.1f}%)"
+                )
+
+
+def run(
+    target: str,
+    base_url: str,
+    concurrency: int,
+    repeats: int,
+    output: Optional[Path],
+    baseline: Optional[Path],
+) -> dict:
+    questions = [item["question"] for item in json.loads(EVAL_QUESTIONS_PATH.read_text())]
+    results = {}
+
+    if target in ("retriever", "all"):
+        config = load_production_config()
+        retriever = VectorRetriever.from_config(
+            config["retrieval"], vectorstore_dir=VECTORSTORE_DIR, model_name=MODEL_NAME
+        )
+        logger.info(f"Benchmarking VectorRetriever (concurrency={concurrency})")
+        results["retriever"] = benchmark_retriever(retriever, questions, concurrency, repeats)
+
+    if target in ("stream", "all"):
+        logger.info(f"Benchmarking {base_url}/rag/stream (concurrency={concurrency})")
+        results["stream"] = asyncio.run(
+            benchmark_stream(base_url, questions, concurrency, repeats)
+        )
+
+    for name, stats in results.items():
+        latency = stats["latency"]
+        logger.info(
+            f"{name:>9} | p50={latency.get('p50_ms', 0):.1f}ms "
+            f"p90={latency.get('p90_ms', 0):.1f}ms p99={latency.get('p99_ms', 0):.1f}ms "
+            f"throughput={stats['throughput_rps']:.1f} req/s"
+        )
+        if "ttft" in stats:
+            logger.info(
+                f"{name:>9} | ttft p50={stats['ttft'].get('p50_ms', 0):.1f}ms "
+                f"p99={stats['ttft'].get('p99_ms', 0):.1f}ms"
+            )
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "concurrency": concurrency,
+        "repeats": repeats,
+        "results": results,
+    }
+
+    output = output or BENCHMARKS_DIR / f"{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    logger.info(f"Saved benchmark results to {output}")
+
+    if baseline is not None:
+        compare(report, json.loads(baseline.read_text(encoding="utf-8")))
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=(
+            "Latency benchmark for retrieval and /rag/stream. For offline runs start "
+            "the API with USE_DUMMY_LLM=true, or point OLLAMA_BASE_URL at "
+            "`python -m src.evaluation.fake_ollama`."
+        )
+    )
+    parser.add_argument("--target", choices=["retriever", "stream", "all"], default="all")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None,
+                        help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    run(args.target, args.url, args.concurrency, args.repeats, args.output, args.baseline)
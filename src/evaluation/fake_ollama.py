@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+# ---------------------------------------------------------------------
+# Minimal stand-in for Ollama's /api/chat, for offline benchmarks and tests
+# ---------------------------------------------------------------------
+
+FIRST_TOKEN_MS = float(os.getenv("FAKE_OLLAMA_FIRST_TOKEN_MS", "150"))
+TOKEN_MS = float(os.getenv("FAKE_OLLAMA_TOKEN_MS", "20"))
+NUM_TOKENS = int(os.getenv("FAKE_OLLAMA_NUM_TOKENS", "64"))
+
+ANSWER_WORDS = (
+    "Hypertension is persistently elevated arterial blood pressure (Page 1) ."
+).split()
+
+
+def _message(model: str, content: str, done: bool, **extra) -> bytes:
+    payload = {
+        "model": model,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "message": {"role": "assistant", "content": content},
+        "done": done,
+        **extra,
+    }
+    return (json.dumps(payload) + "\n").encode("utf-8")
+
+
+def create_app(
+    first_token_ms: float = FIRST_TOKEN_MS,
+    token_ms: float = TOKEN_MS,
+    num_tokens: int = NUM_TOKENS,
+) -> FastAPI:
+    app = FastAPI(title="Fake Ollama")
+    app.state.active = 0
+    app.state.max_active = 0
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        """
+        Streams num_tokens words as NDJSON after a first_token_ms delay
+        (prompt processing), then one token every token_ms.
+        """
+        body = await request.json()
+        model = body.get("model", "fake")
+
+        async def token_stream():
+            app.state.active += 1
+            app.state.max_active = max(app.state.max_active, app.state.active)
+            try:
+                t_start = time.perf_counter()
+                await asyncio.sleep(first_token_ms / 1000)
+
+                for i in range(num_tokens):
+                    if i:
+                        await asyncio.sleep(token_ms / 1000)
+                    yield _message(model, ANSWER_WORDS[i % len(ANSWER_WORDS)] + " ", False)
+
+                yield _message(
+                    model, "", True,
+                    done_reason="stop",
+                    total_duration=int((time.perf_counter() - t_start) * 1e9),
+                    eval_count=num_tokens,
+                )
+            finally:
+                app.state.active -= 1
+
+        if not body.get("stream", True):
+            await asyncio.sleep((first_token_ms + token_ms * num_tokens) / 1000)
+            text = " ".join(ANSWER_WORDS[i % len(ANSWER_WORDS)] for i in range(num_tokens))
+            return json.loads(_message(model, text, True, done_reason="stop"))
+
+        return StreamingResponse(token_stream(), media_type="application/x-ndjson")
+
+    return app
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    args = parser.parse_args()
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
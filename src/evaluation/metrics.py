@@ -19,4 +19,59 @@ def citation_accuracy(cited_pages, retrieved_pages):
     return float(all(p in retrieved_pages for p in cited_pages))
 
 def mean(xs):
-    return float(np.mean(xs)) if xs else 0.0
\ No newline at end of file
+    return float(np.mean(xs)) if xs else 0.0
+
+def retrieval_metrics(retrieved_pages, expected_pages):
+    """
+    Vectorized recall / precision / MRR / nDCG over a batch of questions.
+
+    retrieved_pages: one ranked page list per question
+    expected_pages: one list of relevant pages per question
+
+    recall and precision match the per-question functions above. For MRR and
+    nDCG only the first chunk hitting a given expected page counts, so several
+    chunks from one page cannot push nDCG above 1.
+    """
+    n = len(retrieved_pages)
+    if n == 0:
+        return {"recall": 0.0, "precision": 0.0, "mrr": 0.0, "ndcg": 0.0}
+
+    depth = max((len(pages) for pages in retrieved_pages), default=0) or 1
+
+    hits = np.zeros((n, depth), dtype=bool)
+    gains = np.zeros((n, depth), dtype=np.float64)
+    retrieved_counts = np.zeros(n)
+    ideal_counts = np.zeros(n, dtype=np.int64)
+
+    for i, (retrieved, expected) in enumerate(zip(retrieved_pages, expected_pages)):
+        expected = set(expected)
+        seen = set()
+        for rank, page in enumerate(retrieved):
+            if page in expected:
+                hits[i, rank] = True
+                if page not in seen:
+                    gains[i, rank] = 1.0
+                    seen.add(page)
+        retrieved_counts[i] = len(retrieved)
+        ideal_counts[i] = min(len(expected), depth)
+
+    recalls = hits.any(axis=1).astype(np.float64)
+    precisions = np.divide(
+        hits.sum(axis=1), retrieved_counts,
+        out=np.zeros(n), where=retrieved_counts > 0,
+    )
+
+    first_hit = gains.argmax(axis=1)
+    reciprocal_ranks = np.where(gains.any(axis=1), 1.0 / (first_hit + 1), 0.0)
+
+    discounts = 1.0 / np.log2(np.arange(depth) + 2.0)
+    dcg = gains @ discounts
+    idcg = np.concatenate([[0.0], np.cumsum(discounts)])[ideal_counts]
+    ndcgs = np.divide(dcg, idcg, out=np.zeros(n), where=idcg > 0)
+
+    return {
+        "recall": float(recalls.mean()),
+        "precision": float(precisions.mean()),
+        "mrr": float(reciprocal_ranks.mean()),
+        "ndcg": float(ndcgs.mean()),
+    }
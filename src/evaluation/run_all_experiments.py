@@ -1,27 +1,23 @@
-import dagshub
-
-# Dagshub must be initialized BEFORE mlflow import
-dagshub.init(
-    repo_owner="Nikhil-MLOPs",
-    repo_name="Medwise-Rag",
-    mlflow=True
-)
-
+import argparse
+import asyncio
 import json
 import time
 import logging
 from pathlib import Path
-import mlflow
+from typing import List, Tuple
+
+import yaml
+from langchain_core.documents import Document
 
 from src.evaluation.config import load_config
+from src.evaluation.vectorstores import materialize_vectorstores
 from src.evaluation.metrics import (
-    recall,
-    precision,
     citation_accuracy,
     extract_cited_pages,
     mean,
+    retrieval_metrics,
 )
-from src.retrieval.retriever import VectorRetriever
+from src.retrieval.retriever import VectorRetriever, load_embeddings
 from src.rag.chain import RAGChain
 
 
@@ -41,17 +37,82 @@ logger = logging.getLogger("phase6.evaluation")
 BASE_CONFIG_PATH = Path("configs/base.yaml")
 EXPERIMENTS_DIR = Path("configs/experiments")
 EVAL_QUESTIONS_PATH = Path("data/eval/questions.json")
+RAW_DATA_DIR = Path("data/data_raw")
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
 
-def run_all_experiments():
+def embedding_settings(ingestion: dict) -> dict:
+    """
+    Embedding backend keys of an ingestion config section: queries must be
+    encoded by the backend that embedded the experiment's vectorstore.
+    """
+    keys = ("embedding_backend", "onnx_model_dir", "onnx_quantized")
+    return {key: ingestion[key] for key in keys if key in ingestion}
+
+
+def build_retriever(config: dict, vectorstore_dir: Path, embeddings) -> VectorRetriever:
+    return VectorRetriever.from_config(
+        {**config["retrieval"], **embedding_settings(config.get("ingestion", {}))},
+        vectorstore_dir=vectorstore_dir,
+        model_name=MODEL_NAME,
+        embeddings=embeddings,
+    )
+
+
+async def generate_answers(
+    rag_chain: RAGChain,
+    questions: List[str],
+    documents: List[List[Document]],
+    concurrency: int,
+) -> List[Tuple[str, dict]]:
+    """
+    Generate one answer per question, keeping at most `concurrency`
+    LLM calls in flight. Returns (answer, timings) in question order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def generate(question: str, docs: List[Document]) -> Tuple[str, dict]:
+        timings = {}
+        async with semaphore:
+            answer = await rag_chain.agenerate_answer_from_docs(question, docs, timings)
+        return answer, timings
+
+    return await asyncio.gather(
+        *(generate(question, docs) for question, docs in zip(questions, documents))
+    )
+
+
+def run_all_experiments(retrieval_only: bool = False):
     """
     Runs all config-driven RAG experiments and logs metrics to Dagshub MLflow.
-    This function is intentionally verbose in logging to avoid silent blocking.
+
+    The embedding model is loaded once and shared by every experiment's
+    retriever. Questions are embedded in one batch, each experiment retrieves
+    for all of them in one call, and LLM generations run concurrently up to
+    evaluation.llm_concurrency.
+
+    retrieval_only: skip generation and log only recall / precision / MRR /
+    nDCG, a fast loop for tuning k, fetch_k and strategy.
     """
 
     logger.info("Starting Phase 6: Evaluation & Controlled Experiments")
 
-    mlflow.set_experiment("Evaluating - System")
+    # Here rather than at import time: vectorstore builds and their PDF
+    # parsers run in spawn processes, which re-import this module
+    import dagshub
+
+    # Dagshub must be initialized BEFORE mlflow import
+    dagshub.init(
+        repo_owner="Nikhil-MLOPs",
+        repo_name="Medwise-Rag",
+        mlflow=True
+    )
+
+    import mlflow
+
+    mlflow.set_experiment(
+        "Evaluating - Retrieval" if retrieval_only else "Evaluating - System"
+    )
 
     questions = json.loads(EVAL_QUESTIONS_PATH.read_text())
     logger.info(f"Loaded {len(questions)} evaluation questions")
@@ -59,89 +120,114 @@ def run_all_experiments():
     experiment_files = sorted(EXPERIMENTS_DIR.glob("exp_*.yaml"))
     logger.info(f"Discovered {len(experiment_files)} experiment configs")
 
+    configs = {
+        exp_path.stem: load_config(BASE_CONFIG_PATH, exp_path)
+        for exp_path in experiment_files
+    }
+    base_config = yaml.safe_load(BASE_CONFIG_PATH.read_text())
+    evaluation = base_config["evaluation"]
+
+    logger.info("Materializing per-chunking-config vectorstores")
+    vectorstore_dirs = materialize_vectorstores(
+        configs,
+        pdf_paths=sorted(RAW_DATA_DIR.glob("*.pdf")),
+        model_name=MODEL_NAME,
+        max_workers=evaluation.get("build_workers", 2),
+    )
+
+    logger.info("Loading shared embedding model")
+    embeddings = load_embeddings(
+        MODEL_NAME, **embedding_settings(base_config.get("ingestion", {}))
+    )
+
+    question_texts = [item["question"] for item in questions]
+
+    # MiniLM has no query/document prompt split, so one batched encode
+    # yields the same vectors as per-question embed_query calls
+    t_embed_start = time.perf_counter()
+    question_embeddings = embeddings.embed_documents(question_texts)
+    embedding_time = time.perf_counter() - t_embed_start
+    logger.info(f"Embedded {len(question_texts)} questions in {embedding_time:.2f}s")
+
+    concurrency = evaluation.get("llm_concurrency", 4)
+
     for exp_index, exp_path in enumerate(experiment_files, start=1):
         logger.info("=" * 80)
         logger.info(f"[{exp_index}/{len(experiment_files)}] Starting experiment: {exp_path.name}")
 
-        config = load_config(BASE_CONFIG_PATH, exp_path)
+        config = configs[exp_path.stem]
+        vectorstore_dir = vectorstore_dirs[exp_path.stem]
 
         with mlflow.start_run(run_name=exp_path.stem):
             mlflow.log_params(config["chunking"])
             mlflow.log_params(config["retrieval"])
             mlflow.log_params(config["llm"])
+            mlflow.log_param("vectorstore", vectorstore_dir.name)
 
-            logger.info("Initializing VectorRetriever")
-            retriever = VectorRetriever(
-                vectorstore_dir=Path("data/vectorstore"),
-                model_name="sentence-transformers/all-MiniLM-L6-v2",
-                k=config["retrieval"]["k"],
-                strategy=config["retrieval"]["strategy"],
-            )
-
-            logger.info("Initializing RAGChain (non-streaming for evaluation)")
-            rag_chain = RAGChain(retriever)
-
-            recalls, precisions, citations = [], [], []
-            retrieval_latencies, generation_latencies, e2e_latencies = [], [], []
-
-            for q_index, item in enumerate(questions, start=1):
-                question = item["question"]
-                expected_pages = item["expected_pages"]
+            logger.info(f"Initializing VectorRetriever on {vectorstore_dir}")
+            retriever = build_retriever(config, vectorstore_dir, embeddings)
 
-                logger.info(f"Experiment {exp_path.stem} | Question {q_index}/{len(questions)}")
-                logger.info(f"Question text: {question}")
+            logger.info("Running batched retrieval step")
+            t_search_start = time.perf_counter()
+            documents = retriever.retrieve_batch_by_vector(
+                question_embeddings, question_texts
+            )
+            search_time = time.perf_counter() - t_search_start
 
-                t_start = time.perf_counter()
+            # Batched work is amortized evenly over the questions
+            retrieval_latency = (embedding_time + search_time) / len(questions)
+            logger.info(f"Retrieved documents for all questions in {search_time:.2f}s")
 
-                logger.info("Running retrieval step")
-                t_retrieval_start = time.perf_counter()
-                documents = retriever.retrieve(question)
-                t_retrieval_end = time.perf_counter()
+            retrieved_pages = [
+                [
+                    doc.metadata.get("page")
+                    for doc in docs
+                    if doc.metadata.get("page") is not None
+                ]
+                for docs in documents
+            ]
+            scores = retrieval_metrics(
+                retrieved_pages, [item["expected_pages"] for item in questions]
+            )
 
-                logger.info(
-                    f"Retrieved {len(documents)} documents in "
-                    f"{t_retrieval_end - t_retrieval_start:.2f}s"
-                )
+            logger.info(
+                f"Retrieval metrics | recall={scores['recall']:.2f}, "
+                f"precision={scores['precision']:.2f}, "
+                f"mrr={scores['mrr']:.2f}, ndcg={scores['ndcg']:.2f}"
+            )
 
-                logger.info("Running LLM generation step")
-                t_generation_start = time.perf_counter()
-                answer = rag_chain.generate_answer(question)
-                t_generation_end = time.perf_counter()
+            mlflow.log_metrics(scores)
+            mlflow.log_metric("retrieval_latency", retrieval_latency)
 
-                logger.info(
-                    f"Generated answer in "
-                    f"{t_generation_end - t_generation_start:.2f}s"
-                )
+            if retrieval_only:
+                logger.info(f"Completed experiment: {exp_path.stem} (retrieval only)")
+                continue
 
-                t_end = time.perf_counter()
+            logger.info("Initializing RAGChain (non-streaming for evaluation)")
+            rag_chain = RAGChain(retriever)
 
-                retrieved_pages = [
-                    doc.metadata.get("page")
-                    for doc in documents
-                    if doc.metadata.get("page") is not None
-                ]
-                cited_pages = extract_cited_pages(answer)
+            logger.info(f"Running LLM generation step (concurrency={concurrency})")
+            t_llm_start = time.perf_counter()
+            answers = asyncio.run(
+                generate_answers(rag_chain, question_texts, documents, concurrency)
+            )
+            logger.info(
+                f"Generated {len(answers)} answers in "
+                f"{time.perf_counter() - t_llm_start:.2f}s"
+            )
 
-                recalls.append(recall(retrieved_pages, expected_pages))
-                precisions.append(precision(retrieved_pages, expected_pages))
-                citations.append(citation_accuracy(cited_pages, retrieved_pages))
+            citations, generation_latencies, e2e_latencies = [], [], []
 
-                retrieval_latencies.append(t_retrieval_end - t_retrieval_start)
-                generation_latencies.append(t_generation_end - t_generation_start)
-                e2e_latencies.append(t_end - t_start)
+            for pages, (answer, timings) in zip(retrieved_pages, answers):
+                citations.append(citation_accuracy(extract_cited_pages(answer), pages))
+                generation_latencies.append(timings["llm_time"])
+                e2e_latencies.append(retrieval_latency + timings["llm_time"])
 
-                logger.info(
-                    f"Metrics so far | recall={recalls[-1]:.2f}, "
-                    f"precision={precisions[-1]:.2f}, "
-                    f"citation_accuracy={citations[-1]:.2f}"
-                )
+            logger.info(f"Generation metrics | citation_accuracy={mean(citations):.2f}")
 
             logger.info(f"Logging aggregated metrics for {exp_path.stem}")
 
-            mlflow.log_metric("recall", mean(recalls))
-            mlflow.log_metric("precision", mean(precisions))
             mlflow.log_metric("citation_accuracy", mean(citations))
-            mlflow.log_metric("retrieval_latency", mean(retrieval_latencies))
             mlflow.log_metric("generation_latency", mean(generation_latencies))
             mlflow.log_metric("end_to_end_latency", mean(e2e_latencies))
 
@@ -151,4 +237,12 @@ def run_all_experiments():
 
 
 if __name__ == "__main__":
-    run_all_experiments()
+    parser = argparse.ArgumentParser(description="Run all evaluation experiments")
+    parser.add_argument(
+        "--retrieval-only",
+        action="store_true",
+        help="Skip LLM generation and log retrieval metrics only",
+    )
+    args = parser.parse_args()
+
+    run_all_experiments(retrieval_only=args.retrieval_only)
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+from src.ingestion.manifest import embedding_model_key, file_sha256
+from src.ingestion.pipeline import run_ingestion_from_config
+
+logger = logging.getLogger(__name__)
+
+
+EXPERIMENT_VECTORSTORES_DIR = Path("data/experiment_vectorstores")
+
+
+def corpus_hash(pdf_paths: List[Path]) -> str:
+    digest = hashlib.sha256()
+    for path in sorted(pdf_paths):
+        digest.update(f"{path.name}:{file_sha256(path)}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def vectorstore_key(chunking: dict, model_key: str, source_hash: str) -> str:
+    """
+    Key of the vectorstore an experiment needs: experiments sharing
+    chunking params, embedding model (backend included, see
+    embedding_model_key) and source PDFs share one store.
+    """
+    payload = json.dumps(
+        {
+            "chunk_size": chunking["chunk_size"],
+            "chunk_overlap": chunking["chunk_overlap"],
+            "model_name": model_key,
+            "source_hash": source_hash,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _build(
+    pdf_paths: List[Path],
+    persist_dir: Path,
+    model_name: str,
+    chunking: dict,
+    ingestion: dict,
+) -> Path:
+    run_ingestion_from_config(pdf_paths, persist_dir, model_name, chunking, ingestion)
+    return persist_dir
+
+
+def materialize_vectorstores(
+    configs: Dict[str, dict],
+    pdf_paths: List[Path],
+    model_name: str,
+    max_workers: int = 2,
+    root_dir: Path = EXPERIMENT_VECTORSTORES_DIR,
+) -> Dict[str, Path]:
+    """
+    Ensure one vectorstore per distinct chunking config and return
+    experiment name -> vectorstore dir.
+
+    Stores live under root_dir/<key>; ingestion is incremental, so a store
+    that is already up to date costs only a hash check. Missing stores are
+    built in parallel processes (sharing the on-disk embedding cache).
+    """
+    source_hash = corpus_hash(pdf_paths)
+
+    keys = {
+        name: vectorstore_key(
+            config["chunking"],
+            embedding_model_key(
+                model_name,
+                config.get("ingestion", {}).get("embedding_backend", "torch"),
+                config.get("ingestion", {}).get("onnx_quantized", True),
+            ),
+            source_hash,
+        )
+        for name, config in configs.items()
+    }
+    distinct = {keys[name]: config for name, config in configs.items()}
+
+    logger.info(
+        f"{len(configs)} experiments need {len(distinct)} distinct vectorstores"
+    )
+
+    # spawn, not fork: each build loads its own model and Chroma client
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        futures = {
+            key: pool.submit(
+                _build,
+                pdf_paths,
+                root_dir / key,
+                model_name,
+                config["chunking"],
+                config.get("ingestion", {}),
+            )
+            for key, config in distinct.items()
+        }
+        for key, future in futures.items():
+            future.result()
+            logger.info(f"Vectorstore {key} ready")
+
+    return {name: root_dir / key for name, key in keys.items()}
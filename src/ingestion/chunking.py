@@ -1,5 +1,5 @@
 import logging
-from typing import List
+from typing import Iterable, Iterator, List
 
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
@@ -24,4 +24,22 @@ def chunk_documents(
     chunks = splitter.split_documents(documents)
 
     logger.info(f"Created {len(chunks)} chunks")
-    return chunks
\ No newline at end of file
+    return chunks
+
+
+def iter_chunk_documents(
+    documents: Iterable[Document],
+    chunk_size: int,
+    chunk_overlap: int,
+) -> Iterator[Document]:
+    """
+    Streaming variant of chunk_documents. Pages are split independently,
+    exactly as split_documents does, so the chunks are identical.
+    """
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    )
+
+    for doc in documents:
+        yield from splitter.split_documents([doc])
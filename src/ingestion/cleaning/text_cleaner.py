@@ -1,29 +1,36 @@
 import logging
 import re
-from typing import List
+from typing import Iterable, Iterator, List
 
 from langchain_core.documents import Document
 
 logger = logging.getLogger(__name__)
 
 
-def clean_documents(documents: List[Document]) -> List[Document]:
-    cleaned_docs = []
+def clean_document(doc: Document) -> Document:
+    text = doc.page_content
 
-    logger.info("Starting document cleaning")
+    text = re.sub(r"\s+", " ", text)
+    text = text.replace("\x00", "").strip()
+
+    return Document(
+        page_content=text,
+        metadata=doc.metadata,
+    )
 
+
+def iter_clean_documents(documents: Iterable[Document]) -> Iterator[Document]:
+    """
+    Streaming variant of clean_documents: cleans one page at a time.
+    """
     for doc in documents:
-        text = doc.page_content
+        yield clean_document(doc)
 
-        text = re.sub(r"\s+", " ", text)
-        text = text.replace("\x00", "").strip()
 
-        cleaned_doc = Document(
-            page_content=text,
-            metadata=doc.metadata,
-        )
+def clean_documents(documents: List[Document]) -> List[Document]:
+    logger.info("Starting document cleaning")
 
-        cleaned_docs.append(cleaned_doc)
+    cleaned_docs = list(iter_clean_documents(documents))
 
     logger.info("Document cleaning completed")
-    return cleaned_docs
\ No newline at end of file
+    return cleaned_docs
@@ -1,38 +1,204 @@
 import logging
+import queue
+import threading
+import time
+import uuid
+from itertools import islice
 from pathlib import Path
-from typing import List
+from typing import Iterable, List, Optional
 
 from langchain_core.documents import Document
 from langchain_chroma import Chroma
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from tqdm import tqdm
 
+from src.ingestion.manifest import embedding_model_key
+from src.retrieval.embedding_cache import CachedEmbeddings, EmbeddingCache
+
 logger = logging.getLogger(__name__)
 
 
-def build_vectorstore(
-    chunks: List[Document],
+def open_vectorstore(
     persist_dir: Path,
     model_name: str,
-    batch_size: int,
+    embedding_cache_dir: Optional[Path] = None,
+    embedding_backend: str = "torch",
+    onnx_model_dir: Optional[Path] = None,
+    onnx_quantized: bool = True,
 ) -> Chroma:
-    logger.info(f"Initializing HuggingFace embeddings: {model_name}")
+    model_key = embedding_model_key(model_name, embedding_backend, onnx_quantized)
 
-    embeddings = HuggingFaceEmbeddings(
-        model_name=model_name,
-    )
+    if embedding_backend == "onnx":
+        # Only the ONNX backend needs onnxruntime
+        from src.retrieval.onnx_embeddings import OnnxEmbeddings
+
+        logger.info(f"Initializing ONNX embeddings from {onnx_model_dir}")
+        embeddings = OnnxEmbeddings(onnx_model_dir, quantized=onnx_quantized)
+    else:
+        logger.info(f"Initializing HuggingFace embeddings: {model_name}")
+        embeddings = HuggingFaceEmbeddings(
+            model_name=model_name,
+        )
+
+    if embedding_cache_dir is not None:
+        logger.info(f"Using on-disk embedding cache at {embedding_cache_dir}")
+        embeddings = CachedEmbeddings(
+            embeddings, EmbeddingCache(embedding_cache_dir, model_key)
+        )
 
     logger.info("Initializing Chroma vector store")
-    vectorstore = Chroma(
+    return Chroma(
         embedding_function=embeddings,
         persist_directory=str(persist_dir),
     )
 
-    logger.info("Starting batched embedding")
 
-    for i in tqdm(range(0, len(chunks), batch_size)):
-        batch = chunks[i : i + batch_size]
-        vectorstore.add_documents(batch)
+def _chroma_collection(vectorstore: Chroma):
+    """
+    The underlying chromadb collection. langchain_chroma (as of 1.1.0) has no
+    public way to write precomputed vectors, since add_texts/add_documents
+    always re-embed, so this is the one place relying on its private
+    `_collection` attribute. Recheck it when upgrading langchain-chroma.
+    """
+    return vectorstore._collection
+
+
+def _upsert(vectorstore: Chroma, docs: List[Document], vectors: List[List[float]]) -> None:
+    _chroma_collection(vectorstore).upsert(
+        ids=[d.id or str(uuid.uuid4()) for d in docs],
+        embeddings=vectors,
+        documents=[d.page_content for d in docs],
+        metadatas=[d.metadata or None for d in docs],
+    )
+
+
+def add_chunks(
+    vectorstore: Chroma,
+    chunks: Iterable[Document],
+    batch_size: int,
+    encode_batch_size: int = 512,
+    encode_workers: int = 1,
+    queue_size: int = 4,
+) -> int:
+    """
+    Embed and store chunks with encoding decoupled from Chroma writes.
+
+    Producer threads encode windows of `encode_batch_size` chunks, sorted by
+    length so padding is minimal, while the calling thread bulk-upserts the
+    precomputed vectors in batches of `batch_size`. Chunks carrying an id are
+    upserted under that id, so re-adding an unchanged chunk never duplicates it.
+    """
+    logger.info(
+        f"Starting batched embedding (encode_batch_size={encode_batch_size}, "
+        f"encode_workers={encode_workers}, upsert_batch_size={batch_size})"
+    )
+
+    embeddings = vectorstore.embeddings
+    encoded: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    chunk_iter = iter(chunks)
+    source_lock = threading.Lock()
+    stop = threading.Event()
+    stats = {"encode_time": 0.0, "upsert_time": 0.0}
+
+    def produce() -> None:
+        try:
+            while not stop.is_set():
+                # Consumes chunks lazily so streamed ingestion never materializes them all
+                with source_lock:
+                    window = list(islice(chunk_iter, encode_batch_size))
+                if not window:
+                    return
+
+                window.sort(key=lambda d: len(d.page_content))
+                t_start = time.perf_counter()
+                vectors = embeddings.embed_documents([d.page_content for d in window])
+                with source_lock:
+                    stats["encode_time"] += time.perf_counter() - t_start
 
-    logger.info("Embedding completed successfully")
-    return vectorstore
\ No newline at end of file
+                encoded.put((window, vectors))
+        except BaseException as e:
+            encoded.put(e)
+        finally:
+            encoded.put(None)
+
+    producers = [
+        threading.Thread(target=produce, name=f"encode-{i}", daemon=True)
+        for i in range(encode_workers)
+    ]
+    for producer in producers:
+        producer.start()
+
+    added = 0
+    finished = 0
+    t_wall = time.perf_counter()
+
+    try:
+        with tqdm(unit="chunk") as progress:
+            while finished < len(producers):
+                item = encoded.get()
+                if item is None:
+                    finished += 1
+                    continue
+                if isinstance(item, BaseException):
+                    raise item
+
+                docs, vectors = item
+                t_start = time.perf_counter()
+                for i in range(0, len(docs), batch_size):
+                    _upsert(vectorstore, docs[i : i + batch_size], vectors[i : i + batch_size])
+                stats["upsert_time"] += time.perf_counter() - t_start
+
+                added += len(docs)
+                progress.update(len(docs))
+    finally:
+        # After a failure, stop the producers and drain the queue so none of
+        # them stays blocked on a full queue or keeps encoding for nothing
+        stop.set()
+        while finished < len(producers):
+            if encoded.get() is None:
+                finished += 1
+
+    wall = time.perf_counter() - t_wall
+
+    if isinstance(embeddings, CachedEmbeddings):
+        logger.info(
+            f"Embedding cache: {embeddings.hits} hits, {embeddings.misses} encoded"
+        )
+    logger.info(
+        f"Embedding completed successfully: {added} chunks in {wall:.1f}s | "
+        f"encode {stats['encode_time']:.1f}s "
+        f"({added / max(stats['encode_time'], 1e-9):.1f} chunks/s per busy second), "
+        f"upsert {stats['upsert_time']:.1f}s "
+        f"({added / max(stats['upsert_time'], 1e-9):.1f} chunks/s)"
+    )
+    return added
+
+
+def build_vectorstore(
+    chunks: Iterable[Document],
+    persist_dir: Path,
+    model_name: str,
+    batch_size: int,
+    encode_batch_size: int = 512,
+    encode_workers: int = 1,
+    embedding_cache_dir: Optional[Path] = None,
+    embedding_backend: str = "torch",
+    onnx_model_dir: Optional[Path] = None,
+    onnx_quantized: bool = True,
+) -> Chroma:
+    vectorstore = open_vectorstore(
+        persist_dir,
+        model_name,
+        embedding_cache_dir,
+        embedding_backend=embedding_backend,
+        onnx_model_dir=onnx_model_dir,
+        onnx_quantized=onnx_quantized,
+    )
+    add_chunks(
+        vectorstore,
+        chunks,
+        batch_size,
+        encode_batch_size=encode_batch_size,
+        encode_workers=encode_workers,
+    )
+    return vectorstore
@@ -0,0 +1,82 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from langchain_core.documents import Document
+from pypdf import PdfReader
+
+logger = logging.getLogger(__name__)
+
+# Per-worker-process reader cache, so each worker parses a PDF's xref once
+_READERS: Dict[str, PdfReader] = {}
+
+
+def _reader(pdf_path: str) -> PdfReader:
+    if pdf_path not in _READERS:
+        _READERS[pdf_path] = PdfReader(pdf_path)
+    return _READERS[pdf_path]
+
+
+def count_pages(pdf_path: Path) -> int:
+    return len(PdfReader(str(pdf_path)).pages)
+
+
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> List[Document]:
+    """
+    Worker task: extract pages [start, stop) with the same text mode and
+    page metadata as PyPDFLoader.
+    """
+    reader = _reader(pdf_path)
+    total_pages = len(reader.pages)
+
+    documents = []
+    for page_number in range(start, stop):
+        text = reader.pages[page_number].extract_text(extraction_mode="plain")
+        documents.append(
+            Document(
+                page_content=text.strip(),
+                metadata={
+                    "source": pdf_path,
+                    "total_pages": total_pages,
+                    "page": page_number,
+                    "page_label": reader.page_labels[page_number],
+                },
+            )
+        )
+    return documents
+
+
+def iter_pdf_pages(
+    pdf_paths: List[Path],
+    workers: int = 4,
+    pages_per_task: int = 32,
+) -> Iterator[Document]:
+    """
+    Parse PDFs in a process pool, one page range per task, and yield pages
+    in document order. At most 2 * workers ranges are in flight, so memory
+    stays bounded regardless of corpus size.
+    """
+    tasks: List[Tuple[str, int, int]] = []
+    for pdf_path in pdf_paths:
+        n_pages = count_pages(pdf_path)
+        logger.info(f"Queueing {pdf_path.name}: {n_pages} pages")
+        tasks.extend(
+            (str(pdf_path), start, min(start + pages_per_task, n_pages))
+            for start in range(0, n_pages, pages_per_task)
+        )
+
+    # spawn, not fork: the parent may already run Chroma/torch threads
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        in_flight = []
+        next_task = 0
+
+        while next_task < len(tasks) or in_flight:
+            while next_task < len(tasks) and len(in_flight) < 2 * workers:
+                in_flight.append(pool.submit(_extract_page_range, *tasks[next_task]))
+                next_task += 1
+
+            yield from in_flight.pop(0).result()
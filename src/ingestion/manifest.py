@@ -0,0 +1,130 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(
+    source: str,
+    page: int,
+    text: str,
+    chunk_size: int,
+    chunk_overlap: int,
+) -> str:
+    """
+    Deterministic chunk id: the same file name, page, text and chunking
+    params always map to the same id, so re-ingestion can diff by id.
+    """
+    key = f"{Path(source).name}\x1f{page}\x1f{chunk_size}\x1f{chunk_overlap}\x1f{text}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def assign_chunk_ids(
+    chunks: Iterable[Document],
+    chunk_size: int,
+    chunk_overlap: int,
+) -> Iterator[Document]:
+    for chunk in chunks:
+        chunk.id = chunk_id(
+            chunk.metadata.get("source", ""),
+            chunk.metadata.get("page", -1),
+            chunk.page_content,
+            chunk_size,
+            chunk_overlap,
+        )
+        yield chunk
+
+
+def embedding_model_key(
+    model_name: str,
+    embedding_backend: str = "torch",
+    onnx_quantized: bool = True,
+) -> str:
+    """
+    Name the vectors are recorded under (manifest, embedding cache).
+    ONNX vectors differ slightly from the torch ones, so they get their own.
+    """
+    if embedding_backend == "torch":
+        return model_name
+    if embedding_backend == "onnx":
+        return f"{model_name}@{'onnx-int8' if onnx_quantized else 'onnx'}"
+    raise ValueError(f"Unsupported embedding backend: {embedding_backend}")
+
+
+class IngestionManifest:
+    def __init__(self, settings: dict, files: Dict[str, dict]):
+        """
+        Record of what is in the vectorstore:
+        settings (model + chunking) and, per source file, its content hash
+        and the ids of the chunks it produced.
+        """
+        self.settings = settings
+        self.files = files
+
+    @classmethod
+    def load(cls, persist_dir: Path) -> "IngestionManifest":
+        path = persist_dir / MANIFEST_FILENAME
+        if not path.exists():
+            return cls(settings={}, files={})
+
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return cls(settings=data["settings"], files=data["files"])
+
+    def save(self, persist_dir: Path) -> None:
+        persist_dir.mkdir(parents=True, exist_ok=True)
+
+        # Sorted keys and ids keep the file byte-stable for DVC
+        (persist_dir / MANIFEST_FILENAME).write_text(
+            json.dumps(
+                {"settings": self.settings, "files": self.files},
+                indent=2,
+                sort_keys=True,
+            ),
+            encoding="utf-8",
+        )
+
+    def plan(
+        self,
+        pdf_paths: List[Path],
+        settings: dict,
+    ) -> Dict[str, List]:
+        """
+        Split sources into changed (new or modified) files, unchanged files
+        and files that disappeared since the last run.
+        """
+        hashes = {path.name: file_sha256(path) for path in pdf_paths}
+        same_settings = self.settings == settings
+
+        changed = [
+            path
+            for path in pdf_paths
+            if not same_settings
+            or self.files.get(path.name, {}).get("sha256") != hashes[path.name]
+        ]
+        unchanged = [path for path in pdf_paths if path not in changed]
+        removed = [name for name in self.files if name not in hashes]
+
+        return {
+            "changed": changed,
+            "unchanged": unchanged,
+            "removed": removed,
+            "hashes": hashes,
+        }
+
+    def chunk_ids(self, name: str) -> List[str]:
+        return self.files.get(name, {}).get("chunk_ids", [])
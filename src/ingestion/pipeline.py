@@ -0,0 +1,227 @@
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+from src.ingestion.chunking import iter_chunk_documents
+from src.ingestion.cleaning.text_cleaner import iter_clean_documents
+from src.ingestion.embeddings import add_chunks, open_vectorstore
+from src.ingestion.loaders.parallel_pdf_loader import iter_pdf_pages
+from src.ingestion.manifest import IngestionManifest, assign_chunk_ids, embedding_model_key
+from src.retrieval.bm25 import BM25_DIRNAME, BM25Index
+
+logger = logging.getLogger(__name__)
+
+
+def _counted(items: Iterable[Document], stats: dict, key: str) -> Iterator[Document]:
+    for item in items:
+        stats[key] += 1
+        yield item
+
+
+def _new_chunks(
+    chunks: Iterable[Document],
+    known_ids: Dict[str, Set[str]],
+    seen_ids: Dict[str, Set[str]],
+    stats: dict,
+) -> Iterator[Document]:
+    """
+    Drop chunks already in the store (or repeated within this run),
+    recording every id seen per source file.
+    """
+    for chunk in chunks:
+        name = Path(chunk.metadata["source"]).name
+        seen = seen_ids.setdefault(name, set())
+
+        if chunk.id in seen:
+            continue
+        seen.add(chunk.id)
+
+        if chunk.id in known_ids.get(name, ()):
+            stats["reused"] += 1
+            continue
+
+        yield chunk
+
+
+def build_bm25_index(vectorstore: Chroma, persist_dir: Path) -> None:
+    """
+    Inverted index for the "hybrid" retrieval strategy, keyed on Chroma ids.
+    """
+    stored = vectorstore.get(include=["documents"])
+    BM25Index.build(stored["ids"], stored["documents"]).save(persist_dir / BM25_DIRNAME)
+
+
+def run_ingestion_pipeline(
+    pdf_paths: List[Path],
+    persist_dir: Path,
+    model_name: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    batch_size: int = 64,
+    workers: int = 4,
+    pages_per_task: int = 32,
+    encode_batch_size: int = 512,
+    encode_workers: int = 1,
+    embedding_cache_dir: Optional[Path] = None,
+    embedding_backend: str = "torch",
+    onnx_model_dir: Optional[Path] = None,
+    onnx_quantized: bool = True,
+) -> Chroma:
+    """
+    Incremental, streaming ingestion:
+    parallel page parsing -> cleaning -> chunking -> embedding.
+
+    A manifest stored with the vectorstore records each file's content hash
+    and chunk ids. Unchanged files are skipped entirely, only new chunks of
+    changed files are embedded, and stale chunks are deleted. The BM25 index
+    is rebuilt whenever the store changed.
+
+    embedding_backend "onnx" embeds with the model exported to
+    onnx_model_dir; its vectors are recorded as a different model, so
+    switching backends re-embeds everything (chunk ids stay the same, the
+    new vectors overwrite the old ones).
+    """
+    settings = {
+        "model_name": embedding_model_key(model_name, embedding_backend, onnx_quantized),
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+    }
+    manifest = IngestionManifest.load(persist_dir)
+    plan = manifest.plan(pdf_paths, settings)
+
+    changed, removed = plan["changed"], plan["removed"]
+    logger.info(
+        f"Ingestion plan: {len(changed)} changed, {len(plan['unchanged'])} unchanged, "
+        f"{len(removed)} removed PDFs"
+    )
+
+    if not changed and not removed:
+        logger.info("Vectorstore is up to date, nothing to embed")
+        vectorstore = Chroma(persist_directory=str(persist_dir))
+        if not (persist_dir / BM25_DIRNAME).exists():
+            build_bm25_index(vectorstore, persist_dir)
+        return vectorstore
+
+    vectorstore = open_vectorstore(
+        persist_dir,
+        model_name,
+        embedding_cache_dir,
+        embedding_backend=embedding_backend,
+        onnx_model_dir=onnx_model_dir,
+        onnx_quantized=onnx_quantized,
+    )
+
+    stats = {"pages": 0, "chunks": 0, "reused": 0, "embedded": 0, "deleted": 0}
+    t_start = time.perf_counter()
+
+    if not manifest.files and vectorstore.get(limit=1)["ids"]:
+        # Store predates the manifest (random ids): rebuild from scratch
+        logger.warning("Vectorstore has no manifest, deleting legacy chunks")
+        legacy = vectorstore.get()["ids"]
+        vectorstore.delete(ids=legacy)
+        stats["deleted"] += len(legacy)
+
+    for name in removed:
+        stale = manifest.chunk_ids(name)
+        if stale:
+            vectorstore.delete(ids=stale)
+            stats["deleted"] += len(stale)
+        del manifest.files[name]
+
+    known_ids = {path.name: set(manifest.chunk_ids(path.name)) for path in changed}
+    seen_ids: Dict[str, Set[str]] = {}
+
+    # Chunk ids do not depend on the model: after a model or backend switch
+    # the stored vectors are stale even where the ids match
+    same_model = manifest.settings.get("model_name") == settings["model_name"]
+    reusable_ids = known_ids if same_model else {}
+
+    if changed:
+        pages = _counted(
+            iter_pdf_pages(changed, workers=workers, pages_per_task=pages_per_task),
+            stats,
+            "pages",
+        )
+        chunks = _counted(
+            assign_chunk_ids(
+                iter_chunk_documents(
+                    iter_clean_documents(pages),
+                    chunk_size=chunk_size,
+                    chunk_overlap=chunk_overlap,
+                ),
+                chunk_size,
+                chunk_overlap,
+            ),
+            stats,
+            "chunks",
+        )
+
+        stats["embedded"] = add_chunks(
+            vectorstore,
+            _new_chunks(chunks, reusable_ids, seen_ids, stats),
+            batch_size,
+            encode_batch_size=encode_batch_size,
+            encode_workers=encode_workers,
+        )
+
+    for path in changed:
+        seen = seen_ids.get(path.name, set())
+        stale = sorted(known_ids[path.name] - seen)
+        if stale:
+            vectorstore.delete(ids=stale)
+            stats["deleted"] += len(stale)
+
+        manifest.files[path.name] = {
+            "sha256": plan["hashes"][path.name],
+            "chunk_ids": sorted(seen),
+        }
+
+    manifest.settings = settings
+    manifest.save(persist_dir)
+
+    build_bm25_index(vectorstore, persist_dir)
+
+    elapsed = time.perf_counter() - t_start
+    logger.info(
+        f"Ingestion throughput: {stats['pages']} pages, {stats['chunks']} chunks "
+        f"in {elapsed:.1f}s ({stats['pages'] / elapsed:.1f} pages/s, "
+        f"{stats['chunks'] / elapsed:.1f} chunks/s)"
+    )
+    logger.info(
+        f"Index delta: {stats['embedded']} embedded, {stats['reused']} reused, "
+        f"{stats['deleted']} deleted chunks"
+    )
+    return vectorstore
+
+
+def run_ingestion_from_config(
+    pdf_paths: List[Path],
+    persist_dir: Path,
+    model_name: str,
+    chunking: dict,
+    ingestion: dict,
+) -> Chroma:
+    """
+    run_ingestion_pipeline with params from the `chunking` and `ingestion`
+    config sections (every ingestion key optional).
+    """
+    return run_ingestion_pipeline(
+        pdf_paths=pdf_paths,
+        persist_dir=persist_dir,
+        model_name=model_name,
+        chunk_size=chunking["chunk_size"],
+        chunk_overlap=chunking["chunk_overlap"],
+        batch_size=ingestion.get("upsert_batch_size", 64),
+        workers=ingestion.get("parse_workers", 4),
+        pages_per_task=ingestion.get("pages_per_task", 32),
+        encode_batch_size=ingestion.get("encode_batch_size", 512),
+        encode_workers=ingestion.get("encode_workers", 1),
+        embedding_cache_dir=ingestion.get("embedding_cache_dir"),
+        embedding_backend=ingestion.get("embedding_backend", "torch"),
+        onnx_model_dir=ingestion.get("onnx_model_dir"),
+        onnx_quantized=ingestion.get("onnx_quantized", True),
+    )
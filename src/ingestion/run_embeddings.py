@@ -1,11 +1,10 @@
 import logging
 from pathlib import Path
 
+import yaml
+
 from src.core.logging_config import setup_logging
-from src.ingestion.chunking import chunk_documents
-from src.ingestion.embeddings import build_vectorstore
-from src.ingestion.loaders.pdf_loader import load_pdf
-from src.ingestion.cleaning.text_cleaner import clean_documents
+from src.ingestion.pipeline import run_ingestion_from_config
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -13,27 +12,25 @@ logger = logging.getLogger(__name__)
 
 RAW_DATA_DIR = Path("data/data_raw")
 VECTORSTORE_DIR = Path("data/vectorstore")
+BASE_CONFIG_PATH = Path("configs/base.yaml")
 
 
 def run():
-    pdf_path = next(RAW_DATA_DIR.glob("*.pdf"))
+    pdf_paths = sorted(RAW_DATA_DIR.glob("*.pdf"))
 
-    documents = load_pdf(pdf_path)
-    cleaned_docs = clean_documents(documents)
+    if not pdf_paths:
+        raise FileNotFoundError("No PDF files found in data/data_raw")
 
-    chunks = chunk_documents(
-        cleaned_docs,
-        chunk_size=800,
-        chunk_overlap=200,
-    )
+    config = yaml.safe_load(BASE_CONFIG_PATH.read_text())
 
-    build_vectorstore(
-        chunks=chunks,
+    run_ingestion_from_config(
+        pdf_paths=pdf_paths,
         persist_dir=VECTORSTORE_DIR,
         model_name="sentence-transformers/all-MiniLM-L6-v2",
-        batch_size=64,
+        chunking=config["chunking"],
+        ingestion=config.get("ingestion", {}),
     )
 
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run()
@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rough per-entry bookkeeping overhead (dict slots, lists, floats)
+ENTRY_OVERHEAD_BYTES = 256
+
+
+class CachedAnswer:
+    def __init__(
+        self,
+        embedding: np.ndarray,
+        pages: List[int],
+        answer: str,
+    ):
+        self.embedding = embedding
+        self.pages = pages
+        self.answer = answer
+        self.created_at = time.monotonic()
+        self.nbytes = (
+            embedding.nbytes + len(answer.encode("utf-8")) + ENTRY_OVERHEAD_BYTES
+        )
+
+
+class SemanticAnswerCache:
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600.0,
+        max_bytes: int = 64 * 1024 * 1024,
+    ):
+        """
+        Answer cache keyed on query embeddings.
+
+        A lookup hits when the cosine similarity between the new query and a
+        cached query is >= similarity_threshold. Entries are evicted by LRU,
+        TTL and a total memory cap, and the whole cache is dropped when the
+        vectorstore version changes.
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._next_key = 0
+        self._nbytes = 0
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+        # Stacked embeddings for vectorized lookup, rebuilt lazily
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[int] = []
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def lookup(self, embedding, version: str) -> Optional[CachedAnswer]:
+        query = self._normalize(embedding)
+
+        with self._lock:
+            self._check_version(version)
+            self._expire()
+
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            if self._matrix is None:
+                self._matrix_keys = list(self._entries.keys())
+                self._matrix = np.stack(
+                    [self._entries[key].embedding for key in self._matrix_keys]
+                )
+
+            scores = self._matrix @ query
+            best = int(np.argmax(scores))
+
+            if scores[best] < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            key = self._matrix_keys[best]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def store(self, embedding, pages: List[int], answer: str, version: str) -> None:
+        entry = CachedAnswer(self._normalize(embedding), pages, answer)
+
+        if entry.nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            self._check_version(version)
+
+            self._entries[self._next_key] = entry
+            self._next_key += 1
+            self._nbytes += entry.nbytes
+
+            while (
+                len(self._entries) > self.max_entries or self._nbytes > self.max_bytes
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+
+            self._matrix = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+            self._matrix = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+    def _check_version(self, version: str) -> None:
+        if self._version == version:
+            return
+
+        if self._entries:
+            logger.info("Vectorstore changed, invalidating semantic answer cache")
+            self.invalidations += 1
+
+        self._entries.clear()
+        self._nbytes = 0
+        self._matrix = None
+        self._version = version
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [
+            key for key, entry in self._entries.items() if entry.created_at < cutoff
+        ]
+
+        for key in expired:
+            self._nbytes -= self._entries.pop(key).nbytes
+
+        if expired:
+            self._matrix = None
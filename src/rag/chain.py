@@ -1,16 +1,28 @@
+import asyncio
 import logging
+from contextlib import aclosing
 import os
-from typing import AsyncGenerator, List
+import re
+import time
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
 
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
 from langchain_ollama import ChatOllama
 
 from langchain_core.tracers import LangChainTracer
 from langchain_core.callbacks.manager import CallbackManager
 
+from src.core import metrics
+from src.rag.cache import SemanticAnswerCache
+from src.rag.context import ContextPacker
+from src.rag.gateway import OllamaGateway
+from src.retrieval.batcher import QueryEmbeddingBatcher
+from src.retrieval.executor import RetrievalExecutor
+from src.retrieval.result_cache import normalize_query
 from src.retrieval.retriever import VectorRetriever
 
 logger = logging.getLogger(__name__)
@@ -54,15 +66,52 @@ PROMPT = ChatPromptTemplate.from_messages(
     ]
 )
 
+# ---------------------------
+# Timing report
+# ---------------------------
+def source_metadata(docs: List[Document]) -> List[dict]:
+    return [
+        {"page": d.metadata.get("page"), "source": d.metadata.get("source")}
+        for d in docs
+    ]
+
+
+def timing_report(timings: dict) -> dict:
+    """
+    Stable, machine-readable view of the per-stage timings a request
+    collected (seconds, rounded to the millisecond). Stages that did not
+    run, e.g. generation on a cache hit, are left out.
+    """
+    report = {}
+    for key in (
+        "embedding_time", "search_time", "retrieval_time",
+        "prompt_time", "queue_time", "ttft", "llm_time",
+    ):
+        if key in timings:
+            report[key] = round(timings[key], 3)
+
+    if "ttft" in timings and "llm_time" in timings:
+        report["generation_time"] = round(timings["llm_time"] - timings["ttft"], 3)
+
+    tokens = timings.get("tokens", 0)
+    report["tokens"] = tokens
+    decode_time = timings.get("llm_time", 0.0) - timings.get("ttft", 0.0)
+    if tokens > 1 and decode_time > 0:
+        report["tokens_per_second"] = round((tokens - 1) / decode_time, 1)
+
+    report["cache_hit"] = timings.get("cache_hit", False)
+    return report
+
 # ---------------------------
 # Dummy LLM for CI
 # ---------------------------
 class DummyChatModel(BaseChatModel):
     async def _agenerate(self, messages, stop=None, **kwargs):
-        return AIMessage(content="CI dummy response")
+        return self._generate(messages, stop=stop, **kwargs)
 
     def _generate(self, messages, stop=None, **kwargs):
-        return AIMessage(content="CI dummy response")
+        message = AIMessage(content="CI dummy response")
+        return ChatResult(generations=[ChatGeneration(message=message)])
 
     @property
     def _llm_type(self) -> str:
@@ -72,8 +121,28 @@ class DummyChatModel(BaseChatModel):
 # RAG Chain
 # ---------------------------
 class RAGChain:
-    def __init__(self, retriever: VectorRetriever):
+    def __init__(
+        self,
+        retriever: VectorRetriever,
+        executor: Optional[RetrievalExecutor] = None,
+        batcher: Optional[QueryEmbeddingBatcher] = None,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        context_packer: Optional[ContextPacker] = None,
+        gateway: Optional[OllamaGateway] = None,
+        llm_config: Optional[dict] = None,
+    ):
+        """
+        llm_config: the `llm` config section (model, temperature, num_ctx,
+        num_predict), used by the direct Ollama client; the gateway gets
+        the same values from its caller.
+        """
+        llm_config = llm_config or {}
         self.retriever = retriever
+        self.executor = executor
+        self.batcher = batcher
+        self.answer_cache = answer_cache
+        self.context_packer = context_packer
+        self.gateway = gateway
 
         callbacks = None
         if os.getenv("LANGCHAIN_TRACING_V2", "false").lower() == "true":
@@ -84,68 +153,440 @@ class RAGChain:
             logger.warning("Initializing RAGChain with Dummy LLM (CI mode)")
             self.llm: BaseChatModel = DummyChatModel()
             self.streaming_enabled = False
+            self.gateway = None
         else:
+            model = llm_config.get("model", "llama3.2")
             logger.info(
-                f"Initializing RAGChain with Ollama (llama3.2) @ {OLLAMA_BASE_URL}"
+                f"Initializing RAGChain with Ollama ({model}) @ {OLLAMA_BASE_URL}"
             )
             self.llm = ChatOllama(
-                model="llama3.2",
+                model=model,
                 base_url=OLLAMA_BASE_URL,
-                temperature=0.1,
+                temperature=llm_config.get("temperature", 0.1),
                 streaming=True,
-                num_ctx=2048,
-                num_predict=256,
+                num_ctx=llm_config.get("num_ctx", 2048),
+                num_predict=llm_config.get("num_predict", 256),
                 callbacks=callbacks,
             )
             self.streaming_enabled = True
 
+        # Upper bound on a generation, used to estimate tokens saved by aborts
+        self.max_tokens = llm_config.get("num_predict", 256)
+
+        # Async generation goes through the gateway; self.llm serves the sync path
+        if self.gateway is not None:
+            logger.info(
+                f"Routing generations through the Ollama gateway ({self.gateway.model}, "
+                f"max {self.gateway.max_concurrent} concurrent)"
+            )
+
         self.prompt = PROMPT
 
     # ---------------------------
-    # Streaming path (API)
+    # Retrieval
     # ---------------------------
-    async def stream_answer(self, question: str) -> AsyncGenerator[bytes, None]:
-        logger.info(f"Running RAG (streaming) for question: {question}")
-
+    def retrieve(self, question: str, timings: Optional[dict] = None) -> List[Document]:
+        """
+        Run retrieval once for a request.
+        The returned documents are meant to be handed to the *_from_docs entry points.
+        """
+        t_start = time.perf_counter()
         docs: List[Document] = self.retriever.retrieve(question)
 
-        context = "\n\n".join(
-            f"(Page {d.metadata.get('page', 'N/A')}) {d.page_content}"
-            for d in docs
+        if timings is not None:
+            timings["retrieval_time"] = time.perf_counter() - t_start
+        return docs
+
+    async def aembed_query(
+        self,
+        question: str,
+        timings: Optional[dict] = None,
+    ) -> List[float]:
+        t_start = time.perf_counter()
+
+        if self.batcher is not None:
+            embedding = await self.batcher.embed(question)
+            # Includes the batching window: that wait is part of the request latency
+            metrics.EMBEDDING_SECONDS.observe(time.perf_counter() - t_start)
+        else:
+            embedding = await self._run_blocking(self.retriever.embed_query, question)
+
+        if timings is not None:
+            timings["embedding_time"] = time.perf_counter() - t_start
+        return embedding
+
+    async def aretrieve(
+        self,
+        question: str,
+        timings: Optional[dict] = None,
+        embedding: Optional[List[float]] = None,
+    ) -> List[Document]:
+        """
+        Async retrieval that never blocks the event loop.
+        Uses the bounded retrieval pool and the query micro-batcher when configured.
+        Pass `embedding` to skip re-encoding a query that was already embedded.
+        """
+        if embedding is None and self.batcher is None:
+            return await self._run_blocking(self.retrieve, question, timings)
+
+        if embedding is None:
+            if self.retriever.result_cache is not None:
+                # A result-cache hit skips the embedding as well as the search
+                t_start = time.perf_counter()
+                docs = await self._run_blocking(self.retriever.cached_retrieve, question)
+                if docs is not None:
+                    if timings is not None:
+                        timings["retrieval_time"] = time.perf_counter() - t_start
+                    return docs
+
+            embedding = await self.aembed_query(question, timings)
+
+        t_search_start = time.perf_counter()
+        docs = await self._run_blocking(
+            self.retriever.retrieve_by_vector, embedding, question
         )
+        search_time = time.perf_counter() - t_search_start
+
+        if timings is not None:
+            timings["search_time"] = search_time
+            timings["retrieval_time"] = timings.get("embedding_time", 0.0) + search_time
+        return docs
+
+    async def _run_blocking(self, fn, *args):
+        if self.executor is not None:
+            return await self.executor.run(fn, *args)
+        return await asyncio.to_thread(fn, *args)
+
+    def build_messages(self, question: str, docs: List[Document]):
+        if self.context_packer is not None:
+            context = self.context_packer.pack(docs, reserved_text=SYSTEM_PROMPT + question)
+        else:
+            context = "\n\n".join(
+                f"(Page {d.metadata.get('page', 'N/A')}) {d.page_content}"
+                for d in docs
+            )
 
-        messages = self.prompt.format_messages(
+        return self.prompt.format_messages(
             question=question,
             context=context,
         )
 
-        # Dummy LLM does not support streaming
-        if not self.streaming_enabled:
-            response = self.llm.invoke(messages)
-            yield response.content.encode("utf-8")
+    # ---------------------------
+    # Streaming path (API)
+    # ---------------------------
+    async def stream_answer_from_docs(
+        self,
+        question: str,
+        docs: List[Document],
+        timings: Optional[dict] = None,
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Stream an answer grounded on already retrieved documents.
+        Fills `timings` with prompt_time, queue_time, ttft, tokens and llm_time
+        when provided. ttft and llm_time exclude the wait for a gateway slot.
+        """
+        t_prompt_start = time.perf_counter()
+        messages = self.build_messages(question, docs)
+        t_llm_start = time.perf_counter()
+
+        prompt_time = t_llm_start - t_prompt_start
+        metrics.PROMPT_SECONDS.observe(prompt_time)
+        if timings is not None:
+            timings["prompt_time"] = prompt_time
+
+        t_first_token = None
+        tokens = 0
+        llm_timings = {}
+        stream = None
+
+        try:
+            # Dummy LLM does not support streaming
+            if not self.streaming_enabled:
+                response = self.llm.invoke(messages)
+                t_first_token = time.perf_counter()
+                tokens = 1
+                yield response.content.encode("utf-8")
+                return
+
+            # Ollama streams one token per chunk
+            stream = self._stream_tokens(messages, llm_timings)
+            async for content in stream:
+                if content:
+                    if t_first_token is None:
+                        t_first_token = time.perf_counter()
+                    tokens += 1
+                    yield content.encode("utf-8")
+        except (GeneratorExit, asyncio.CancelledError):
+            # Consumer went away (client disconnect): closing `stream` below
+            # drops the Ollama connection, which stops generation server-side
+            metrics.GENERATIONS_CANCELLED.inc()
+            metrics.TOKENS_SAVED.inc(max(self.max_tokens - tokens, 0))
+            logger.info(f"Generation cancelled after {tokens} tokens")
+            raise
+        finally:
+            if stream is not None:
+                # Frees the gateway slot now rather than at garbage collection
+                await stream.aclose()
+
+            t_end = time.perf_counter()
+
+            # Generation starts once the gateway grants a slot
+            queue_time = llm_timings.get("queue_time", 0.0)
+            t_llm_start += queue_time
+            if timings is not None and "queue_time" in llm_timings:
+                timings["queue_time"] = queue_time
+
+            if t_first_token is not None:
+                metrics.TTFT_SECONDS.observe(t_first_token - t_llm_start)
+                if tokens > 1 and t_end > t_first_token:
+                    metrics.TOKENS_PER_SECOND.observe((tokens - 1) / (t_end - t_first_token))
+
+            if timings is not None:
+                timings["llm_time"] = t_end - t_llm_start
+                timings["tokens"] = tokens
+                if t_first_token is not None:
+                    timings["ttft"] = t_first_token - t_llm_start
+
+    async def _stream_tokens(self, messages, timings: dict) -> AsyncGenerator[str, None]:
+        if self.gateway is not None:
+            async for token in self.gateway.stream_chat(messages, timings):
+                yield token
             return
 
         async for chunk in self.llm.astream(messages):
-            if chunk.content:
-                yield chunk.content.encode("utf-8")
+            yield chunk.content
+
+    async def stream_answer(
+        self,
+        question: str,
+        timings: Optional[dict] = None,
+        sources: Optional[list] = None,
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Full request pipeline: embed -> answer cache -> search -> generate.
+        Retrieval runs once and its documents are handed to stream_answer_from_docs.
+        When `sources` is given, the cited chunks' metadata is appended to it
+        before the first token is yielded.
+        """
+        logger.info(f"Running RAG (streaming) for question: {question}")
+
+        if self.answer_cache is None:
+            docs = await self.aretrieve(question, timings)
+            if sources is not None:
+                sources.extend(source_metadata(docs))
+            async with aclosing(self.stream_answer_from_docs(question, docs, timings)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+            return
+
+        embedding = await self.aembed_query(question, timings)
+        version = self.retriever.collection_version()
+
+        cached = self.answer_cache.lookup(embedding, version)
+        if cached is not None:
+            metrics.ANSWER_CACHE_HITS.inc()
+        else:
+            metrics.ANSWER_CACHE_MISSES.inc()
+        if timings is not None:
+            timings["cache_hit"] = cached is not None
+
+        if cached is not None:
+            logger.info("Serving answer from semantic cache")
+            pieces = re.findall(r"\s*\S+\s*", cached.answer)
+            if timings is not None:
+                timings["tokens"] = len(pieces)
+            if sources is not None:
+                sources.extend({"page": page} for page in cached.pages)
+            for piece in pieces:
+                yield piece.encode("utf-8")
+            return
+
+        docs = await self.aretrieve(question, timings, embedding=embedding)
+        if sources is not None:
+            sources.extend(source_metadata(docs))
+
+        pieces = []
+        async with aclosing(self.stream_answer_from_docs(question, docs, timings)) as chunks:
+            async for chunk in chunks:
+                pieces.append(chunk)
+                yield chunk
+
+        # Only reached when the stream completed without error or disconnect
+        pages = [
+            d.metadata["page"] for d in docs if d.metadata.get("page") is not None
+        ]
+        self.answer_cache.store(
+            embedding, pages, b"".join(pieces).decode("utf-8"), version
+        )
 
     # ---------------------------
     # Non-streaming path (evaluation)
     # ---------------------------
-    def generate_answer(self, question: str) -> str:
-        logger.info(f"Running RAG (non-streaming) for question: {question}")
+    def generate_answer_from_docs(
+        self,
+        question: str,
+        docs: List[Document],
+        timings: Optional[dict] = None,
+    ) -> str:
+        t_prompt_start = time.perf_counter()
+        messages = self.build_messages(question, docs)
+        t_llm_start = time.perf_counter()
 
-        docs: List[Document] = self.retriever.retrieve(question)
+        response = self.llm.invoke(messages)
+
+        if timings is not None:
+            timings["prompt_time"] = t_llm_start - t_prompt_start
+            timings["llm_time"] = time.perf_counter() - t_llm_start
+        return response.content
+
+    async def agenerate_answer_from_docs(
+        self,
+        question: str,
+        docs: List[Document],
+        timings: Optional[dict] = None,
+    ) -> str:
+        """
+        Async variant of generate_answer_from_docs, so evaluation can keep
+        several generations in flight at once.
+        """
+        t_prompt_start = time.perf_counter()
+        messages = self.build_messages(question, docs)
+        t_llm_start = time.perf_counter()
 
-        context = "\n\n".join(
-            f"(Page {d.metadata.get('page', 'N/A')}) {d.page_content}"
-            for d in docs
+        llm_timings = {}
+        if self.gateway is not None:
+            answer = await self.gateway.generate(messages, llm_timings)
+        else:
+            answer = (await self.llm.ainvoke(messages)).content
+
+        if timings is not None:
+            timings["prompt_time"] = t_llm_start - t_prompt_start
+            if "queue_time" in llm_timings:
+                timings["queue_time"] = llm_timings["queue_time"]
+            timings["llm_time"] = (
+                time.perf_counter() - t_llm_start - llm_timings.get("queue_time", 0.0)
+            )
+        return answer
+
+    # ---------------------------
+    # Batch path (API)
+    # ---------------------------
+    async def answer_batch(
+        self,
+        questions: List[str],
+        concurrency: int = 4,
+        timings: Optional[dict] = None,
+    ) -> List[dict]:
+        """
+        Answer many questions with one embedding call and one batched search.
+
+        Repeated questions (after normalization) are retrieved and generated
+        once, with at most `concurrency` LLM calls in flight. Semantic cache
+        hits skip generation. Results come back in input order; a question
+        whose generation fails gets an "error" instead of failing the batch.
+
+        Generations are shared per question, not per retrieved context: the
+        prompt contains the question, so two questions landing on the same
+        chunks still need their own answer.
+        """
+        logger.info(f"Running RAG (batch) for {len(questions)} questions")
+        t_start = time.perf_counter()
+
+        unique: Dict[str, str] = {}
+        for question in questions:
+            unique.setdefault(normalize_query(question), question)
+        texts = list(unique.values())
+
+        # Result-cache hits need neither embedding nor search, unless the
+        # embedding is wanted for the semantic answer cache
+        docs_per_text: List[Optional[List[Document]]] = [None] * len(texts)
+        if self.answer_cache is None and self.retriever.result_cache is not None:
+            docs_per_text = await self._run_blocking(
+                lambda: [self.retriever.cached_retrieve(text) for text in texts]
+            )
+        misses = [i for i, docs in enumerate(docs_per_text) if docs is None]
+        miss_texts = [texts[i] for i in misses]
+
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        if misses:
+            miss_embeddings = await self._run_blocking(self.retriever.embed_queries, miss_texts)
+            for i, embedding in zip(misses, miss_embeddings):
+                embeddings[i] = embedding
+        t_embedded = time.perf_counter()
+
+        if misses:
+            miss_docs = await self._run_blocking(
+                self.retriever.retrieve_batch_by_vector,
+                [embeddings[i] for i in misses],
+                miss_texts,
+            )
+            for i, docs in zip(misses, miss_docs):
+                docs_per_text[i] = docs
+        t_searched = time.perf_counter()
+
+        version = (
+            self.retriever.collection_version() if self.answer_cache is not None else None
         )
+        semaphore = asyncio.Semaphore(concurrency)
 
-        messages = self.prompt.format_messages(
-            question=question,
-            context=context,
+        async def generate(
+            text: str,
+            embedding,
+            docs: List[Document],
+        ) -> Tuple[Optional[str], Optional[str], dict]:
+            item_timings = {}
+            if self.answer_cache is not None:
+                cached = self.answer_cache.lookup(embedding, version)
+                if cached is not None:
+                    metrics.ANSWER_CACHE_HITS.inc()
+                    item_timings["cache_hit"] = True
+                    return cached.answer, None, item_timings
+                metrics.ANSWER_CACHE_MISSES.inc()
+
+            try:
+                async with semaphore:
+                    answer = await self.agenerate_answer_from_docs(text, docs, item_timings)
+            except Exception as e:
+                # One failed generation must not throw away the rest of the batch
+                logger.exception(f"Batch generation failed for question: {text}")
+                return None, str(e), item_timings
+
+            if self.answer_cache is not None:
+                pages = [d.metadata["page"] for d in docs if d.metadata.get("page") is not None]
+                self.answer_cache.store(embedding, pages, answer, version)
+            return answer, None, item_timings
+
+        answers = await asyncio.gather(
+            *(
+                generate(text, embedding, docs)
+                for text, embedding, docs in zip(texts, embeddings, docs_per_text)
+            )
         )
+        by_key = dict(zip(unique, zip(docs_per_text, answers)))
 
-        response = self.llm.invoke(messages)
-        return response.content
+        if timings is not None:
+            timings["embedding_time"] = t_embedded - t_start
+            timings["search_time"] = t_searched - t_embedded
+            timings["llm_time"] = time.perf_counter() - t_searched
+            timings["unique_questions"] = len(texts)
+
+        results = []
+        for question in questions:
+            docs, (answer, error, item_timings) = by_key[normalize_query(question)]
+            result = {
+                "question": question,
+                "answer": answer,
+                "cited_pages": sorted({int(p) for p in re.findall(r"Page\s+(\d+)", answer or "")}),
+                "sources": source_metadata(docs),
+                "timings": timing_report(item_timings),
+            }
+            if error is not None:
+                result["error"] = error
+            results.append(result)
+        return results
+
+    def generate_answer(self, question: str) -> str:
+        logger.info(f"Running RAG (non-streaming) for question: {question}")
+
+        docs = self.retrieve(question)
+        return self.generate_answer_from_docs(question, docs)
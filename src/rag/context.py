@@ -0,0 +1,159 @@
+import logging
+import math
+import re
+from typing import Callable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from src.core import metrics
+
+logger = logging.getLogger(__name__)
+
+# Shortest suffix/prefix match treated as real chunk overlap, not coincidence
+MIN_OVERLAP_CHARS = 20
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+WORD = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough Llama-style token count: words and punctuation, plus a quarter
+    for sub-word splits. Close enough to budget a context window without
+    shipping the model's tokenizer.
+    """
+    return math.ceil(len(WORD.findall(text)) * 1.25)
+
+
+def merge_overlap(left: str, right: str) -> Optional[str]:
+    """
+    Join two chunks from the same page when one contains the other or the
+    end of `left` repeats at the start of `right` (splitter overlap).
+    """
+    if right in left:
+        return left
+    if left in right:
+        return right
+
+    for size in range(min(len(left), len(right)), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+        if right.endswith(left[:size]):
+            return right + left[size:]
+    return None
+
+
+def _shingles(sentence: str) -> set:
+    words = re.findall(r"\w+", sentence.lower())
+    return {" ".join(words[i:i + 3]) for i in range(max(len(words) - 2, 1))}
+
+
+class ContextPacker:
+    def __init__(
+        self,
+        num_ctx: int = 2048,
+        num_predict: int = 256,
+        safety_margin: int = 64,
+        duplicate_threshold: float = 0.8,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+    ):
+        """
+        Build the prompt context within the model's window.
+
+        Chunks from the same page are merged where they overlap, sentences
+        repeated across chunks are dropped (word-trigram Jaccard >=
+        duplicate_threshold), and blocks are packed in retrieval rank order
+        until num_ctx minus num_predict, the prompt itself and a safety
+        margin is used up. A block that does not fit is cut at a sentence
+        boundary.
+        """
+        self.num_ctx = num_ctx
+        self.num_predict = num_predict
+        self.safety_margin = safety_margin
+        self.duplicate_threshold = duplicate_threshold
+        self.count_tokens = count_tokens
+
+    def budget(self, reserved_text: str) -> int:
+        return max(
+            self.num_ctx - self.num_predict - self.safety_margin
+            - self.count_tokens(reserved_text),
+            0,
+        )
+
+    def pack(self, docs: List[Document], reserved_text: str = "") -> str:
+        """
+        `reserved_text` is the rest of the prompt (system message and
+        question), whose tokens are taken off the budget first.
+        """
+        budget = self.budget(reserved_text)
+        raw_tokens = sum(self.count_tokens(d.page_content) for d in docs)
+
+        blocks = self._merge_blocks(docs)
+        kept_shingles: List[set] = []
+        parts = []
+        used = 0
+
+        for page, text in blocks:
+            header = f"(Page {page}) "
+            header_tokens = self.count_tokens(header)
+            if used + header_tokens >= budget:
+                break
+
+            sentences = []
+            block_tokens = header_tokens
+            for sentence in SENTENCE_SPLIT.split(text):
+                shingles = _shingles(sentence)
+                if self._is_duplicate(shingles, kept_shingles):
+                    continue
+
+                tokens = self.count_tokens(sentence)
+                if used + block_tokens + tokens > budget:
+                    break
+
+                sentences.append(sentence)
+                kept_shingles.append(shingles)
+                block_tokens += tokens
+
+            if sentences:
+                parts.append(header + " ".join(sentences))
+                used += block_tokens
+
+        context = "\n\n".join(parts)
+
+        packed_tokens = self.count_tokens(context)
+        saved = max(raw_tokens - packed_tokens, 0)
+        metrics.CONTEXT_TOKENS_SAVED.inc(saved)
+        logger.info(
+            f"Packed context: {raw_tokens} -> {packed_tokens} tokens "
+            f"({saved} saved, budget {budget})"
+        )
+        return context
+
+    def _merge_blocks(self, docs: List[Document]) -> List[Tuple[object, str]]:
+        """
+        Fold overlapping chunks of one page into a single block, kept at
+        the rank of its best chunk.
+        """
+        blocks: List[list] = []
+        for doc in docs:
+            page = doc.metadata.get("page", "N/A")
+            source = doc.metadata.get("source")
+            text = doc.page_content.strip()
+
+            for block in blocks:
+                if block[0] == (source, page):
+                    merged = merge_overlap(block[1], text)
+                    if merged is not None:
+                        block[1] = merged
+                        break
+            else:
+                blocks.append([(source, page), text])
+
+        return [(key[1], text) for key, text in blocks]
+
+    def _is_duplicate(self, shingles: set, kept: List[set]) -> bool:
+        for other in kept:
+            union = len(shingles | other)
+            if union and len(shingles & other) / union >= self.duplicate_threshold:
+                return True
+        return False
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import AsyncIterator, List, Optional
+
+import httpx
+from langchain_core.messages import BaseMessage
+
+from src.core import metrics
+
+logger = logging.getLogger(__name__)
+
+ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+
+class LLMQueueFull(RuntimeError):
+    pass
+
+
+class LLMQueueTimeout(RuntimeError):
+    pass
+
+
+class OllamaGateway:
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        max_concurrent: int = 2,
+        max_queue: int = 64,
+        queue_timeout: float = 30.0,
+        options: Optional[dict] = None,
+        keep_alive: str = "30m",
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        Single entry point for Ollama generations.
+
+        At most `max_concurrent` generations run at once over a pool of
+        keep-alive connections; further requests wait in a FIFO queue of
+        `max_queue` slots for up to `queue_timeout` seconds. Time spent
+        queued is reported separately from generation time.
+
+        `transport` replaces the network transport (tests, fake servers).
+        """
+        self.model = model
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.options = options or {}
+        self.keep_alive = keep_alive
+
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            transport=transport,
+            limits=httpx.Limits(
+                max_connections=max_concurrent,
+                max_keepalive_connections=max_concurrent,
+            ),
+            # Tokens may pause for a long time; only bound connecting
+            timeout=httpx.Timeout(None, connect=5.0),
+        )
+
+        self._active = 0
+        self._waiters: "deque[asyncio.Future]" = deque()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    # ---------------------------
+    # Admission
+    # ---------------------------
+    async def _acquire(self) -> None:
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            metrics.LLM_QUEUE_REJECTED.inc()
+            raise LLMQueueFull("LLM queue is full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self._release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+
+            if isinstance(e, asyncio.TimeoutError):
+                metrics.LLM_QUEUE_REJECTED.inc()
+                raise LLMQueueTimeout(
+                    f"No LLM slot within {self.queue_timeout:.0f}s"
+                ) from None
+            raise
+
+    def _release(self) -> None:
+        # Hand the slot straight to the oldest waiter so nobody can jump the queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    # ---------------------------
+    # Generation
+    # ---------------------------
+    async def stream_chat(
+        self,
+        messages: List[BaseMessage],
+        timings: Optional[dict] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the assistant reply token by token.
+        Fills timings["queue_time"] with the wait for a generation slot.
+        """
+        t_queued = time.perf_counter()
+        await self._acquire()
+        queue_time = time.perf_counter() - t_queued
+
+        metrics.LLM_QUEUE_SECONDS.observe(queue_time)
+        if timings is not None:
+            timings["queue_time"] = queue_time
+
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": ROLES.get(m.type, "user"), "content": m.content}
+                for m in messages
+            ],
+            "stream": True,
+            "options": self.options,
+            "keep_alive": self.keep_alive,
+        }
+
+        try:
+            async with self._client.stream("POST", "/api/chat", json=payload) as response:
+                response.raise_for_status()
+
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+
+                    message = json.loads(line)
+                    if "error" in message:
+                        raise RuntimeError(f"Ollama error: {message['error']}")
+
+                    content = message.get("message", {}).get("content")
+                    if content:
+                        yield content
+                    if message.get("done"):
+                        break
+        finally:
+            self._release()
+
+    async def generate(
+        self,
+        messages: List[BaseMessage],
+        timings: Optional[dict] = None,
+    ) -> str:
+        return "".join([token async for token in self.stream_chat(messages, timings)])
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from src.core import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Flight:
+    def __init__(self, key: str):
+        """
+        One in-progress generation shared by every request for the same key.
+        Chunks are kept for the flight's lifetime so late joiners replay the
+        prefix before following live output.
+        """
+        self.key = key
+        self.chunks: List[bytes] = []
+        self.timings: dict = {}
+        self.sources: list = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        # Swap in a fresh event so each waiter sees exactly one wake-up per change
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def _produce(self, chunks: AsyncIterator[bytes]) -> None:
+        try:
+            async for chunk in chunks:
+                self.chunks.append(chunk)
+                self._notify()
+        except Exception as e:
+            self.error = e
+        except asyncio.CancelledError:
+            self.error = RuntimeError("Generation cancelled")
+            raise
+        finally:
+            if hasattr(chunks, "aclose"):
+                await chunks.aclose()
+            self.done = True
+            self._notify()
+
+    async def subscribe(self) -> AsyncIterator[bytes]:
+        """
+        Yield every chunk from the start, then live ones until the flight ends.
+        Each subscriber only keeps its own read position.
+        """
+        position = 0
+        while True:
+            changed = self._changed
+            if position < len(self.chunks):
+                yield self.chunks[position]
+                position += 1
+                continue
+            if self.done:
+                break
+            await changed.wait()
+
+        if self.error is not None:
+            raise self.error
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        In-flight request deduplication: the first request for a key starts
+        the work, concurrent ones subscribe to it. Finished flights are
+        dropped immediately, so nothing is served after it completes.
+        """
+        self._flights: Dict[str, Flight] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def join(
+        self,
+        key: str,
+        start: Callable[[Flight], AsyncIterator[bytes]],
+    ) -> Tuple[Flight, bool]:
+        """
+        Return (flight, leader) for `key`, starting `start(flight)` in the
+        background when no flight is running. `start` fills flight.timings
+        and flight.sources as it goes.
+        """
+        flight = self._flights.get(key)
+        leader = flight is None or flight.done
+        if not leader:
+            self.followers += 1
+            metrics.SINGLEFLIGHT_FOLLOWERS.inc()
+            logger.info(f"Joining in-flight generation ({len(flight.chunks)} chunks so far)")
+        else:
+            flight = Flight(key)
+            self._flights[key] = flight
+            self.leaders += 1
+            flight.task = asyncio.create_task(flight._produce(start(flight)))
+            flight.task.add_done_callback(lambda _: self._finish(flight))
+
+        flight.subscribers += 1
+        return flight, leader
+
+    def leave(self, flight: Flight) -> None:
+        """
+        Drop a subscriber. When the last one leaves mid-flight nobody is
+        listening any more, so the generation is cancelled.
+        """
+        flight.subscribers -= 1
+        if flight.subscribers <= 0 and not flight.done and flight.task is not None:
+            logger.info("All subscribers left, cancelling in-flight generation")
+            # Unregister now: the next identical request must start a fresh
+            # flight, not join this one before its cancellation completes
+            self._finish(flight)
+            flight.task.cancel()
+
+    def _finish(self, flight: Flight) -> None:
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from typing import List, Optional, Set, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from src.retrieval.executor import RetrievalExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbeddingBatcher:
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        executor: Optional[RetrievalExecutor] = None,
+    ):
+        """
+        Async micro-batcher for query embeddings.
+
+        Queries arriving within `max_wait_ms` of each other are encoded
+        together with a single `embed_documents` call (up to `max_batch_size`),
+        and each waiting request gets its own vector back.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The loop only keeps weak references to tasks: hold them until done
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def embed(self, query: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[: self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size :]
+            task = asyncio.get_running_loop().create_task(self._encode(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _encode(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        # Identical queries in the same window are encoded once
+        texts = list(dict.fromkeys(query for query, _ in batch))
+
+        try:
+            if self.executor is not None:
+                vectors = await self.executor.run(self.embeddings.embed_documents, texts)
+            else:
+                vectors = await asyncio.to_thread(self.embeddings.embed_documents, texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        logger.debug(f"Encoded {len(texts)} queries for {len(batch)} requests")
+
+        by_text = dict(zip(texts, vectors))
+        for query, future in batch:
+            if not future.done():
+                future.set_result(by_text[query])
@@ -0,0 +1,74 @@
+import json
+import logging
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.core.logging_config import setup_logging
+from src.retrieval.retriever import VectorRetriever
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+VECTORSTORE_DIR = Path("data/vectorstore")
+EVAL_QUESTIONS_PATH = Path("data/eval/questions.json")
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+REPEATS = 20
+
+
+def benchmark(retriever: VectorRetriever, embeddings) -> dict:
+    latencies = []
+
+    # Warm-up so one-off allocations are not counted
+    retriever.retrieve_by_vector(embeddings[0])
+
+    for _ in range(REPEATS):
+        for embedding in embeddings:
+            t_start = time.perf_counter()
+            retriever.retrieve_by_vector(embedding)
+            latencies.append(time.perf_counter() - t_start)
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "mean_ms": float(latencies_ms.mean()),
+        "queries": len(latencies),
+    }
+
+
+def run():
+    """
+    Compare vector search latency of the Chroma and NumPy backends.
+    Query embeddings are computed once, so only the search itself is timed.
+    """
+    questions = [item["question"] for item in json.loads(EVAL_QUESTIONS_PATH.read_text())]
+
+    results = {}
+    for backend in ("chroma", "numpy"):
+        for strategy in ("similarity", "mmr"):
+            retriever = VectorRetriever(
+                vectorstore_dir=VECTORSTORE_DIR,
+                model_name=MODEL_NAME,
+                k=3,
+                strategy=strategy,
+                backend=backend,
+            )
+            embeddings = [retriever.embed_query(q) for q in questions]
+
+            stats = benchmark(retriever, embeddings)
+            results[f"{backend}/{strategy}"] = stats
+
+            logger.info(
+                f"{backend:>6} {strategy:>10} | p50={stats['p50_ms']:.2f}ms "
+                f"p99={stats['p99_ms']:.2f}ms mean={stats['mean_ms']:.2f}ms "
+                f"({stats['queries']} queries)"
+            )
+
+    return results
+
+
+if __name__ == "__main__":
+    run()
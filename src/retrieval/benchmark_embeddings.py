@@ -0,0 +1,172 @@
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from src.core.logging_config import setup_logging
+from src.evaluation.metrics import retrieval_metrics
+from src.retrieval.onnx_embeddings import (
+    QUANTIZED_FILENAME,
+    OnnxEmbeddings,
+    export_onnx_model,
+)
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+VECTORSTORE_DIR = Path("data/vectorstore")
+EVAL_QUESTIONS_PATH = Path("data/eval/questions.json")
+ONNX_MODEL_DIR = Path("data/onnx_models/all-MiniLM-L6-v2")
+OUTPUT_PATH = Path("data/benchmarks/embeddings.json")
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+SAMPLE_CHUNKS = 256
+K = 5
+REPEATS = 20
+
+
+def rss_mb() -> float:
+    """
+    Resident set size of this process, from /proc (Linux only).
+    """
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def load(name: str, factory) -> tuple:
+    before = rss_mb()
+    t_start = time.perf_counter()
+    embeddings = factory()
+    load_time = time.perf_counter() - t_start
+    memory = rss_mb() - before
+
+    logger.info(f"{name:>10} | loaded in {load_time:.2f}s, +{memory:.0f} MB RSS")
+    return embeddings, {"load_s": load_time, "rss_delta_mb": memory}
+
+
+def latency(embeddings, questions: List[str], chunks: List[str]) -> dict:
+    # Warm-up so one-off allocations are not counted
+    embeddings.embed_query(questions[0])
+
+    latencies = []
+    for _ in range(REPEATS):
+        for question in questions:
+            t_start = time.perf_counter()
+            embeddings.embed_query(question)
+            latencies.append(time.perf_counter() - t_start)
+
+    t_start = time.perf_counter()
+    embeddings.embed_documents(chunks)
+    batch_time = time.perf_counter() - t_start
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "query_p50_ms": float(np.percentile(latencies_ms, 50)),
+        "query_p99_ms": float(np.percentile(latencies_ms, 99)),
+        "chunks_per_s": len(chunks) / max(batch_time, 1e-9),
+    }
+
+
+def run():
+    """
+    Compare the ONNX (fp32 and int8) embedding backends with PyTorch.
+
+    Parity: cosine similarity to the torch vectors on the eval questions and
+    a sample of stored chunks, overlap of the top-k chunk ids and recall@k
+    against the eval expected pages (the store keeps its torch vectors, only
+    the query encoder changes). Cost: load time, RSS growth and per-query /
+    batch latency. ONNX is loaded before torch is imported, so each RSS delta
+    is that backend's own footprint.
+    """
+    if not (ONNX_MODEL_DIR / QUANTIZED_FILENAME).exists():
+        logger.info(f"No exported model in {ONNX_MODEL_DIR}, exporting {MODEL_NAME}")
+        export_onnx_model(MODEL_NAME, ONNX_MODEL_DIR)
+        logger.warning("Export imported torch: rerun for representative RSS numbers")
+
+    items = json.loads(EVAL_QUESTIONS_PATH.read_text())
+    questions = [item["question"] for item in items]
+    expected = [item["expected_pages"] for item in items]
+
+    backends: Dict[str, object] = {}
+    results: Dict[str, dict] = {}
+
+    for name, quantized in (("onnx-int8", True), ("onnx", False)):
+        backends[name], results[name] = load(
+            name, lambda: OnnxEmbeddings(ONNX_MODEL_DIR, quantized=quantized)
+        )
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    from src.retrieval.retriever import VectorRetriever
+
+    backends["torch"], results["torch"] = load(
+        "torch", lambda: HuggingFaceEmbeddings(model_name=MODEL_NAME)
+    )
+
+    retriever = VectorRetriever(
+        vectorstore_dir=VECTORSTORE_DIR,
+        model_name=MODEL_NAME,
+        k=K,
+        strategy="similarity",
+        backend="numpy",
+        embeddings=backends["torch"],
+    )
+    chunks = retriever.vectorstore.get(limit=SAMPLE_CHUNKS, include=["documents"])["documents"]
+
+    reference_queries = np.array(backends["torch"].embed_documents(questions))
+    reference_chunks = np.array(backends["torch"].embed_documents(chunks))
+    reference_ids = []
+
+    for name in ("torch", "onnx", "onnx-int8"):
+        embeddings = backends[name]
+        query_vectors = np.array(embeddings.embed_documents(questions))
+        chunk_vectors = np.array(embeddings.embed_documents(chunks))
+
+        # All backends L2-normalize, so row-wise dot products are cosines
+        cosines = np.concatenate([
+            (query_vectors * reference_queries).sum(axis=1),
+            (chunk_vectors * reference_chunks).sum(axis=1),
+        ])
+
+        retrieved = [retriever.retrieve_by_vector(v.tolist()) for v in query_vectors]
+        ids = [[d.id for d in docs] for docs in retrieved]
+        if name == "torch":
+            reference_ids = ids
+
+        overlap = np.mean([
+            len(set(a) & set(b)) / max(len(b), 1) for a, b in zip(ids, reference_ids)
+        ])
+        pages = [
+            [d.metadata.get("page") for d in docs if d.metadata.get("page") is not None]
+            for docs in retrieved
+        ]
+
+        stats = results[name]
+        stats["dimension"] = int(query_vectors.shape[1])
+        stats["cosine_mean"] = float(cosines.mean())
+        stats["cosine_min"] = float(cosines.min())
+        stats[f"top{K}_overlap"] = float(overlap)
+        stats[f"recall@{K}"] = retrieval_metrics(pages, expected)["recall"]
+        stats.update(latency(embeddings, questions, chunks))
+
+        logger.info(
+            f"{name:>10} | dim={stats['dimension']} cos mean={stats['cosine_mean']:.4f} "
+            f"min={stats['cosine_min']:.4f} top{K} overlap={stats[f'top{K}_overlap']:.2f} "
+            f"recall@{K}={stats[f'recall@{K}']:.2f} | "
+            f"p50={stats['query_p50_ms']:.2f}ms p99={stats['query_p99_ms']:.2f}ms "
+            f"{stats['chunks_per_s']:.0f} chunks/s | +{stats['rss_delta_mb']:.0f} MB"
+        )
+
+    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    OUTPUT_PATH.write_text(json.dumps(results, indent=2))
+    logger.info(f"Saved embedding benchmark to {OUTPUT_PATH}")
+    return results
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,176 @@
+import json
+import logging
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# BM25 index lives inside the vectorstore dir so DVC versions them together
+BM25_DIRNAME = "bm25"
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Small English stopword list; medical terms are never dropped
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or "
+    "that the their this to was were what when which who why with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        token
+        for token in TOKEN_PATTERN.findall(text.lower())
+        if token not in STOPWORDS
+    ]
+
+
+class BM25Index:
+    def __init__(
+        self,
+        ids: List[str],
+        vocabulary: Dict[str, int],
+        offsets: np.ndarray,
+        postings: np.ndarray,
+        term_freqs: np.ndarray,
+        doc_lengths: np.ndarray,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        """
+        Okapi BM25 over a CSR-style inverted index.
+
+        Postings of term t are rows postings[offsets[t]:offsets[t + 1]]
+        with matching term_freqs, so the arrays can be memory-mapped.
+        """
+        self.ids = ids
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.postings = postings
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+
+        self._avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        self._length_norm = k1 * (1 - b + b * doc_lengths / max(self._avg_length, 1e-9))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ---------------------------
+    # Build / persist
+    # ---------------------------
+    @classmethod
+    def build(cls, ids: List[str], texts: List[str]) -> "BM25Index":
+        logger.info(f"Building BM25 index over {len(texts)} chunks")
+
+        term_docs: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lengths = np.zeros(len(texts), dtype=np.float32)
+
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths[row] = len(tokens)
+            for term, freq in Counter(tokens).items():
+                term_docs.setdefault(term, []).append((row, freq))
+
+        vocabulary = {term: col for col, term in enumerate(sorted(term_docs))}
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        for term, col in vocabulary.items():
+            offsets[col + 1] = len(term_docs[term])
+        offsets = np.cumsum(offsets)
+
+        postings = np.empty(offsets[-1], dtype=np.int32)
+        term_freqs = np.empty(offsets[-1], dtype=np.float32)
+        for term, col in vocabulary.items():
+            rows, freqs = zip(*term_docs[term])
+            postings[offsets[col] : offsets[col + 1]] = rows
+            term_freqs[offsets[col] : offsets[col + 1]] = freqs
+
+        logger.info(f"BM25 index has {len(vocabulary)} terms, {offsets[-1]} postings")
+        return cls(ids, vocabulary, offsets, postings, term_freqs, doc_lengths)
+
+    def save(self, index_dir: Path) -> None:
+        index_dir.mkdir(parents=True, exist_ok=True)
+
+        np.save(index_dir / "offsets.npy", self.offsets)
+        np.save(index_dir / "postings.npy", self.postings)
+        np.save(index_dir / "term_freqs.npy", self.term_freqs)
+        np.save(index_dir / "doc_lengths.npy", self.doc_lengths)
+        (index_dir / "meta.json").write_text(
+            json.dumps(
+                {
+                    "ids": self.ids,
+                    "vocabulary": self.vocabulary,
+                    "k1": self.k1,
+                    "b": self.b,
+                }
+            ),
+            encoding="utf-8",
+        )
+
+        logger.info(f"Saved BM25 index to {index_dir}")
+
+    @classmethod
+    def load(cls, index_dir: Path, mmap: bool = True) -> "BM25Index":
+        logger.info(f"Loading BM25 index from {index_dir} (mmap={mmap})")
+
+        mode = "r" if mmap else None
+        meta = json.loads((index_dir / "meta.json").read_text(encoding="utf-8"))
+
+        return cls(
+            ids=meta["ids"],
+            vocabulary=meta["vocabulary"],
+            offsets=np.load(index_dir / "offsets.npy", mmap_mode=mode),
+            postings=np.load(index_dir / "postings.npy", mmap_mode=mode),
+            term_freqs=np.load(index_dir / "term_freqs.npy", mmap_mode=mode),
+            doc_lengths=np.load(index_dir / "doc_lengths.npy"),
+            k1=meta["k1"],
+            b=meta["b"],
+        )
+
+    # ---------------------------
+    # Query
+    # ---------------------------
+    def search(self, query: str, k: int) -> Tuple[List[str], List[float]]:
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        n_docs = len(self.ids)
+
+        for term in set(tokenize(query)):
+            col = self.vocabulary.get(term)
+            if col is None:
+                continue
+
+            start, stop = self.offsets[col], self.offsets[col + 1]
+            rows = self.postings[start:stop]
+            freqs = self.term_freqs[start:stop]
+
+            df = stop - start
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            scores[rows] += idf * freqs * (self.k1 + 1) / (freqs + self._length_norm[rows])
+
+        matched = np.flatnonzero(scores)
+        if len(matched) == 0:
+            return [], []
+
+        k = min(k, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [self.ids[row] for row in top], scores[top].tolist()
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], rrf_k: int = 60) -> List[str]:
+    """
+    Fuse ranked id lists: score(id) = sum over lists of 1 / (rrf_k + rank).
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+
+    return sorted(scores, key=scores.get, reverse=True)
@@ -0,0 +1,175 @@
+import fcntl
+import hashlib
+import json
+import logging
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+def text_key(model_name: str, text: str, kind: str = "doc") -> str:
+    """
+    Cache key on (model name, kind, whitespace-normalized text).
+    Queries and documents are kept apart since some models embed them differently.
+    """
+    normalized = re.sub(r"\s+", " ", text).strip()
+    return hashlib.sha1(f"{model_name}\x1f{kind}\x1f{normalized}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir: Path, model_name: str):
+        """
+        Append-only on-disk embedding cache for one model.
+
+        vectors.f32 holds float32 rows (memory-mapped for reads) and keys.txt
+        the matching text hash per row. Writers take an exclusive file lock,
+        so parallel ingestion processes can share one cache.
+        """
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name)
+        self.cache_dir = Path(cache_dir) / slug
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self.model_name = model_name
+        self._vectors_path = self.cache_dir / "vectors.f32"
+        self._keys_path = self.cache_dir / "keys.txt"
+        self._meta_path = self.cache_dir / "meta.json"
+        self._lock_path = self.cache_dir / ".lock"
+        self._lock = threading.Lock()
+
+        self.dim: Optional[int] = None
+        self._rows: Dict[str, int] = {}
+        self._n_rows = 0
+        self._keys_offset = 0
+        self._matrix: Optional[np.ndarray] = None
+
+        with self._lock, self._file_lock():
+            self._sync()
+
+        logger.info(f"Embedding cache {self.cache_dir} has {len(self._rows)} vectors")
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        with self._lock:
+            rows = {key: self._rows[key] for key in keys if key in self._rows}
+            if not rows:
+                return {}
+
+            matrix = self._mapped()
+            return {key: matrix[row].tolist() for key, row in rows.items()}
+
+    def put_many(self, keys: List[str], vectors: List[List[float]]) -> None:
+        with self._lock, self._file_lock():
+            # Pick up rows appended by other processes before writing ours
+            self._sync()
+
+            new = {}
+            for key, vector in zip(keys, vectors):
+                if key not in self._rows:
+                    new[key] = vector
+            if not new:
+                return
+
+            matrix = np.asarray(list(new.values()), dtype=np.float32)
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+                self._meta_path.write_text(
+                    json.dumps({"model_name": self.model_name, "dim": self.dim}),
+                    encoding="utf-8",
+                )
+
+            # Vectors first, then keys: a crash in between leaves only
+            # unreferenced trailing rows, which the truncate drops next time
+            with self._vectors_path.open("ab") as f:
+                f.truncate(self._n_rows * self.dim * 4)
+                f.write(matrix.tobytes())
+            with self._keys_path.open("a", encoding="utf-8") as f:
+                f.write("".join(f"{key}\n" for key in new))
+
+            self._sync()
+
+    def _sync(self) -> None:
+        """
+        Read keys appended since the last sync (caller holds the file lock).
+        """
+        if self.dim is None and self._meta_path.exists():
+            self.dim = json.loads(self._meta_path.read_text(encoding="utf-8"))["dim"]
+        if self.dim is None or not self._keys_path.exists():
+            return
+
+        with self._keys_path.open("rb") as f:
+            f.seek(self._keys_offset)
+            appended = f.read()
+
+        # Ignore a trailing partial line from an interrupted write
+        complete = appended[: appended.rfind(b"\n") + 1]
+        self._keys_offset += len(complete)
+
+        for key in complete.decode("utf-8").split():
+            self._rows.setdefault(key, self._n_rows)
+            self._n_rows += 1
+
+    @contextmanager
+    def _file_lock(self):
+        with self._lock_path.open("a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _mapped(self) -> np.ndarray:
+        if self._matrix is None or len(self._matrix) < self._n_rows:
+            self._matrix = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r",
+                shape=(self._n_rows, self.dim),
+            )
+        return self._matrix
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, read_only: bool = False):
+        """
+        Embeddings wrapper that only encodes texts missing from the cache.
+        read_only consults the cache but never adds to it, for callers whose
+        texts should not grow a cache shared with ingestion.
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+        self.read_only = read_only
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [text_key(self.cache.model_name, text) for text in texts]
+        found = self.cache.get_many(keys)
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            if not self.read_only:
+                self.cache.put_many(list(missing), vectors)
+            found.update(zip(missing, vectors))
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = text_key(self.cache.model_name, text, kind="query")
+        found = self.cache.get_many([key])
+        if key in found:
+            return found[key]
+
+        vector = self.embeddings.embed_query(text)
+        if not self.read_only:
+            self.cache.put_many([key], [vector])
+        return vector
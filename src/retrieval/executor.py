@@ -0,0 +1,84 @@
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalPoolSaturated(RuntimeError):
+    """
+    Raised when the retrieval pool already holds `max_pending` jobs.
+    The API maps this to 503 so clients back off instead of queueing forever.
+    """
+
+
+class RetrievalExecutor:
+    def __init__(self, max_workers: int = 4, max_pending: int = 32):
+        """
+        Bounded thread pool for blocking retrieval work
+        (sentence-transformer encode + Chroma query).
+
+        max_workers: threads running retrieval concurrently
+        max_pending: running + queued jobs accepted before rejecting
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be >= 1")
+        if max_pending < max_workers:
+            raise ValueError("max_pending must be >= max_workers")
+
+        logger.info(
+            f"Initializing retrieval pool with {max_workers} workers, "
+            f"max_pending={max_pending}"
+        )
+
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="retrieval",
+        )
+        # Released from worker threads when a job really finishes
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def saturated(self) -> bool:
+        return self._pending >= self.max_pending
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run `fn` on the pool without blocking the event loop.
+
+        A job counts as pending until it has actually finished: cancelling
+        the awaiting coroutine cannot stop a running job, whose worker
+        thread stays busy.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise RetrievalPoolSaturated(
+                    f"Retrieval pool saturated ({self._pending}/{self.max_pending} pending)"
+                )
+            self._pending += 1
+
+        try:
+            future = self._pool.submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            self._release()
+            raise
+
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        logger.info("Shutting down retrieval pool")
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,149 @@
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def mmr_select(
+    relevance: np.ndarray,
+    redundancy_fn,
+    k: int,
+    lambda_mult: float = 0.5,
+) -> np.ndarray:
+    """
+    Greedy Maximal Marginal Relevance, vectorized over a batch of queries.
+
+    relevance: (B, C) cosine similarity of each query to its C candidates
+    redundancy_fn: maps the (B,) positions just selected to a (B, C) array of
+        similarities between that pick and every candidate of the same query
+    Returns (B, min(k, C)) candidate positions in pick order.
+    """
+    batch, n_candidates = relevance.shape
+    k = min(k, n_candidates)
+    rows = np.arange(batch)
+
+    picks = np.empty((batch, k), dtype=np.int64)
+    taken = np.zeros((batch, n_candidates), dtype=bool)
+
+    best = np.argmax(relevance, axis=1)
+    picks[:, 0] = best
+    taken[rows, best] = True
+    redundancy = redundancy_fn(best)
+
+    for step in range(1, k):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[taken] = -np.inf
+
+        best = np.argmax(scores, axis=1)
+        picks[:, step] = best
+        taken[rows, best] = True
+        redundancy = np.maximum(redundancy, redundancy_fn(best))
+
+    return picks
+
+
+def dense_redundancy(candidate_vectors: np.ndarray):
+    """
+    Exact redundancy from unit-norm candidate vectors of shape (B, C, D).
+    """
+    rows = np.arange(candidate_vectors.shape[0])
+
+    def redundancy(best: np.ndarray) -> np.ndarray:
+        picked = candidate_vectors[rows, best]
+        return np.einsum("bcd,bd->bc", candidate_vectors, picked)
+
+    return redundancy
+
+
+def graph_redundancy(
+    candidates: np.ndarray,
+    neighbor_ids: np.ndarray,
+    neighbor_sims: np.ndarray,
+):
+    """
+    Redundancy looked up from a precomputed top-N chunk neighbor graph.
+
+    candidates: (B, C) global row ids of each query's candidates
+    Pairs outside a chunk's top-N neighbors are treated as unrelated (0.0),
+    which only under-penalizes chunks that are already dissimilar.
+    """
+    rows = np.arange(candidates.shape[0])
+
+    def redundancy(best: np.ndarray) -> np.ndarray:
+        picked = candidates[rows, best]
+        ids = neighbor_ids[picked]
+        sims = neighbor_sims[picked]
+
+        match = candidates[:, :, None] == ids[:, None, :]
+        values = np.where(match, sims[:, None, :], -np.inf).max(axis=2, initial=-np.inf)
+        values[np.isneginf(values)] = 0.0
+        values[rows, best] = 1.0
+        return values
+
+    return redundancy
+
+
+def build_neighbor_graph(
+    embeddings: np.ndarray,
+    n_neighbors: int,
+    block_size: int = 1024,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-N cosine neighbors of every row (excluding itself), computed blockwise
+    so memory stays at block_size x n_rows.
+    """
+    unit = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    n_rows = unit.shape[0]
+    n_neighbors = max(min(n_neighbors, n_rows - 1), 0)
+
+    logger.info(f"Building top-{n_neighbors} neighbor graph for {n_rows} chunks")
+
+    neighbor_ids = np.empty((n_rows, n_neighbors), dtype=np.int32)
+    neighbor_sims = np.empty((n_rows, n_neighbors), dtype=np.float32)
+    if n_neighbors == 0:
+        # Empty or single-chunk store: no chunk has a neighbor
+        return neighbor_ids, neighbor_sims
+
+    for start in range(0, n_rows, block_size):
+        stop = min(start + block_size, n_rows)
+        sims = unit[start:stop] @ unit.T
+        sims[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+
+        top = np.argpartition(-sims, n_neighbors - 1, axis=1)[:, :n_neighbors]
+        neighbor_ids[start:stop] = top
+        neighbor_sims[start:stop] = np.take_along_axis(sims, top, axis=1)
+
+    return neighbor_ids, neighbor_sims
+
+
+def batched_mmr(
+    queries: np.ndarray,
+    candidates: np.ndarray,
+    embeddings: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.5,
+    neighbor_graph: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> np.ndarray:
+    """
+    MMR over per-query candidate lists.
+
+    queries: (B, D) query embeddings
+    candidates: (B, C) row ids into `embeddings` (fetch_k results per query)
+    Returns (B, min(k, C)) selected positions into `candidates`, in pick order.
+    """
+    candidate_vectors = normalize_rows(np.asarray(embeddings[candidates], dtype=np.float32))
+    relevance = np.einsum("bcd,bd->bc", candidate_vectors, normalize_rows(queries))
+
+    if neighbor_graph is not None:
+        redundancy = graph_redundancy(candidates, *neighbor_graph)
+    else:
+        redundancy = dense_redundancy(candidate_vectors)
+
+    return mmr_select(relevance, redundancy, k, lambda_mult)
@@ -0,0 +1,194 @@
+import json
+import logging
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+from src.retrieval.mmr import batched_mmr, build_neighbor_graph
+
+logger = logging.getLogger(__name__)
+
+
+class NumpyVectorIndex:
+    def __init__(
+        self,
+        ids: List[str],
+        embeddings: np.ndarray,
+        documents: List[str],
+        metadatas: List[dict],
+    ):
+        """
+        In-memory exact vector index over a contiguous float32 matrix.
+
+        Scores mirror Chroma's default space (squared L2), so both backends
+        rank and report results the same way.
+        """
+        self.ids = ids
+        self.embeddings = embeddings
+        self.documents = documents
+        self.metadatas = metadatas
+
+        self._row_by_id = {doc_id: row for row, doc_id in enumerate(ids)}
+        self._sq_norms = np.einsum("ij,ij->i", embeddings, embeddings)
+        self.neighbor_graph: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ---------------------------
+    # Loading
+    # ---------------------------
+    @classmethod
+    def from_chroma(
+        cls,
+        vectorstore: Chroma,
+        cache_dir: Optional[Path] = None,
+        version: Optional[str] = None,
+        mmap: bool = False,
+    ) -> "NumpyVectorIndex":
+        """
+        Load every embedding and record from a Chroma collection.
+
+        When `cache_dir` is given, the matrix is persisted there as .npy and
+        reused (optionally memory-mapped) while `version` is unchanged.
+        """
+        if cache_dir is not None and version is not None:
+            index = cls._load_cache(Path(cache_dir), version, mmap)
+            if index is not None:
+                return index
+
+        logger.info("Loading embeddings from Chroma into NumPy index")
+
+        result = vectorstore.get(include=["embeddings", "documents", "metadatas"])
+        embeddings = np.ascontiguousarray(result["embeddings"], dtype=np.float32)
+        if not result["ids"]:
+            # An empty collection comes back as a 1-D array
+            embeddings = np.empty((0, 0), dtype=np.float32)
+        metadatas = [metadata or {} for metadata in result["metadatas"]]
+
+        if cache_dir is not None and version is not None:
+            cls._save_cache(
+                Path(cache_dir), version, result["ids"], embeddings,
+                result["documents"], metadatas,
+            )
+            if mmap:
+                return cls._load_cache(Path(cache_dir), version, mmap)
+
+        logger.info(f"NumPy index ready with {len(result['ids'])} vectors")
+        return cls(result["ids"], embeddings, result["documents"], metadatas)
+
+    @staticmethod
+    def _save_cache(cache_dir, version, ids, embeddings, documents, metadatas) -> None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        np.save(cache_dir / "embeddings.npy", embeddings)
+        (cache_dir / "records.json").write_text(
+            json.dumps({"ids": ids, "documents": documents, "metadatas": metadatas}),
+            encoding="utf-8",
+        )
+        # Written last so a partial write never looks valid
+        (cache_dir / "VERSION").write_text(version, encoding="utf-8")
+
+    @classmethod
+    def _load_cache(cls, cache_dir, version, mmap) -> Optional["NumpyVectorIndex"]:
+        version_path = cache_dir / "VERSION"
+        if not version_path.exists() or version_path.read_text(encoding="utf-8") != version:
+            return None
+
+        logger.info(f"Loading NumPy index from {cache_dir} (mmap={mmap})")
+
+        embeddings = np.load(cache_dir / "embeddings.npy", mmap_mode="r" if mmap else None)
+        records = json.loads((cache_dir / "records.json").read_text(encoding="utf-8"))
+        return cls(records["ids"], embeddings, records["documents"], records["metadatas"])
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+    def get(self, ids: List[str]) -> List[Document]:
+        return [self._document(self._row_by_id[doc_id]) for doc_id in ids if doc_id in self._row_by_id]
+
+    def similarity_search(
+        self,
+        embedding: List[float],
+        k: int,
+    ) -> Tuple[List[Document], List[float]]:
+        return self.similarity_search_batch([embedding], k)[0]
+
+    def similarity_search_batch(
+        self,
+        embeddings: List[List[float]],
+        k: int,
+    ) -> List[Tuple[List[Document], List[float]]]:
+        rows, distances = self._top_k(np.asarray(embeddings, dtype=np.float32), k)
+        return [
+            ([self._document(row) for row in query_rows], query_distances.tolist())
+            for query_rows, query_distances in zip(rows, distances)
+        ]
+
+    def max_marginal_relevance_search(
+        self,
+        embedding: List[float],
+        k: int,
+        fetch_k: int,
+        lambda_mult: float = 0.5,
+    ) -> List[Document]:
+        return self.max_marginal_relevance_search_batch(
+            [embedding], k, fetch_k, lambda_mult
+        )[0]
+
+    def max_marginal_relevance_search_batch(
+        self,
+        embeddings: List[List[float]],
+        k: int,
+        fetch_k: int,
+        lambda_mult: float = 0.5,
+    ) -> List[List[Document]]:
+        queries = np.asarray(embeddings, dtype=np.float32)
+        candidates, _ = self._top_k(queries, fetch_k)
+        if candidates.shape[1] == 0:
+            return [[] for _ in embeddings]
+
+        picks = batched_mmr(
+            queries, candidates, self.embeddings, k, lambda_mult,
+            neighbor_graph=self.neighbor_graph,
+        )
+
+        # Chroma returns the selected chunks in distance order, not pick order
+        rows = np.take_along_axis(candidates, np.sort(picks, axis=1), axis=1)
+        return [[self._document(int(row)) for row in query_rows] for query_rows in rows]
+
+    def build_neighbor_graph(self, n_neighbors: int) -> None:
+        """
+        Precompute each chunk's top-N neighbors so MMR diversity
+        penalties become lookups instead of fresh dot products.
+        """
+        self.neighbor_graph = build_neighbor_graph(self.embeddings, n_neighbors)
+
+    def _top_k(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, len(self))
+        if k <= 0:
+            # Empty index (or k=0): no rows, and argpartition needs k >= 1
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.int64), empty
+        distances = (
+            self._sq_norms[None, :]
+            - 2.0 * (queries @ self.embeddings.T)
+            + np.einsum("ij,ij->i", queries, queries)[:, None]
+        )
+
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        top_distances = np.take_along_axis(distances, top, axis=1)
+        order = np.argsort(top_distances, axis=1)
+        return (
+            np.take_along_axis(top, order, axis=1),
+            np.take_along_axis(top_distances, order, axis=1),
+        )
+
+    def _document(self, row: int) -> Document:
+        return Document(
+            page_content=self.documents[row],
+            metadata=dict(self.metadatas[row]),
+            id=self.ids[row],
+        )
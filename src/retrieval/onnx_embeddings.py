@@ -0,0 +1,148 @@
+import logging
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import onnxruntime as ort
+from langchain_core.embeddings import Embeddings
+from tokenizers import Tokenizer
+
+logger = logging.getLogger(__name__)
+
+
+ONNX_FILENAME = "model.onnx"
+QUANTIZED_FILENAME = "model_quantized.onnx"
+TOKENIZER_FILENAME = "tokenizer.json"
+
+
+def mean_pool(hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """
+    Masked mean over tokens followed by L2 normalization, the same
+    Pooling + Normalize head sentence-transformers puts on MiniLM.
+    """
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (hidden * mask).sum(axis=1)
+    pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    return pooled / np.clip(norms, 1e-12, None)
+
+
+class OnnxEmbeddings(Embeddings):
+    def __init__(
+        self,
+        model_dir: Path,
+        quantized: bool = True,
+        max_length: int = 256,
+        batch_size: int = 64,
+        num_threads: Optional[int] = None,
+    ):
+        """
+        sentence-transformers compatible embeddings served by onnxruntime.
+
+        model_dir holds the exported model (see export_onnx_model) and its
+        tokenizer.json; only onnxruntime and tokenizers are needed at runtime,
+        not torch. quantized picks the int8 variant.
+        """
+        model_dir = Path(model_dir)
+        model_path = model_dir / (QUANTIZED_FILENAME if quantized else ONNX_FILENAME)
+
+        logger.info(f"Loading ONNX embedding model from {model_path}")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = num_threads or os.cpu_count() or 1
+
+        self.session = ort.InferenceSession(
+            str(model_path), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / TOKENIZER_FILENAME))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        pad_id = self.tokenizer.token_to_id("[PAD]") or 0
+        self.tokenizer.enable_padding(pad_id=pad_id, pad_token="[PAD]")
+
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+
+        # Length-sorted batches keep padding (wasted compute) to a minimum
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = np.empty((len(texts), 0), dtype=np.float32)
+
+        for start in range(0, len(order), self.batch_size):
+            rows = order[start:start + self.batch_size]
+            batch = self._encode([texts[i] for i in rows])
+            if vectors.shape[1] == 0:
+                vectors = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+            vectors[rows] = batch
+
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        feeds = {name: value for name, value in feeds.items() if name in self.input_names}
+
+        hidden = self.session.run(None, feeds)[0]
+        return mean_pool(hidden, feeds["attention_mask"])
+
+
+def export_onnx_model(model_name: str, output_dir: Path, quantize: bool = True) -> Path:
+    """
+    Export a Hugging Face encoder to ONNX (plus an int8 dynamically
+    quantized copy) next to its tokenizer.json.
+
+    A one-off step on a dev machine: it needs torch, transformers, onnx and
+    onnxscript, none of which the API needs to serve the result.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.save_pretrained(output_dir)
+
+    model = AutoModel.from_pretrained(model_name).eval()
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+
+    logger.info(f"Exporting {model_name} to {output_dir / ONNX_FILENAME}")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+            str(output_dir / ONNX_FILENAME),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                **{name: {0: "batch", 1: "sequence"} for name in input_names},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=17,
+        )
+
+    if quantize:
+        logger.info(f"Quantizing to int8: {output_dir / QUANTIZED_FILENAME}")
+        quantize_dynamic(
+            str(output_dir / ONNX_FILENAME),
+            str(output_dir / QUANTIZED_FILENAME),
+            weight_type=QuantType.QInt8,
+        )
+
+    return output_dir
@@ -0,0 +1,83 @@
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Log a hit-rate summary every N lookups
+STATS_LOG_INTERVAL = 100
+
+
+def normalize_query(query: str) -> str:
+    """
+    Case/whitespace/trailing-punctuation insensitive form of a query,
+    so "What is acne?" and "what is  acne" share a cache entry.
+    """
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.rstrip(" ?!.")
+
+
+class RetrievalResultCache:
+    def __init__(self, max_entries: int = 1024):
+        """
+        Bounded LRU of retrieval results: key -> (chunk ids, scores).
+
+        Each entry also remembers how long the uncached retrieval took,
+        so hits can report the latency they saved.
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[List[str], List[Optional[float]], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def get(self, key: Hashable) -> Optional[Tuple[List[str], List[Optional[float]]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += entry[2]
+
+            if (self.hits + self.misses) % STATS_LOG_INTERVAL == 0:
+                self._log_stats()
+
+        return None if entry is None else (entry[0], entry[1])
+
+    def put(
+        self,
+        key: Hashable,
+        ids: List[str],
+        scores: List[Optional[float]],
+        cost_seconds: float,
+    ) -> None:
+        with self._lock:
+            self._entries[key] = (ids, scores, cost_seconds)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "saved_seconds": self.saved_seconds,
+        }
+
+    def _log_stats(self) -> None:
+        total = self.hits + self.misses
+        logger.info(
+            f"Retrieval cache: hit_rate={self.hits / total:.2%} "
+            f"({self.hits}/{total}), saved {self.saved_seconds:.2f}s of retrieval"
+        )
@@ -1,12 +1,45 @@
 import logging
+import threading
+import time
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_huggingface import HuggingFaceEmbeddings
 
+from src.core import metrics
+from src.ingestion.manifest import IngestionManifest, embedding_model_key
+from src.retrieval.bm25 import BM25_DIRNAME, BM25Index, reciprocal_rank_fusion
+from src.retrieval.numpy_index import NumpyVectorIndex
+from src.retrieval.result_cache import RetrievalResultCache, normalize_query
+
 logger = logging.getLogger(__name__)
 
 
+def load_embeddings(
+    model_name: str,
+    embedding_backend: str = "torch",
+    onnx_model_dir: Optional[Path] = None,
+    onnx_quantized: bool = True,
+) -> Embeddings:
+    """
+    Query encoder for an embedding backend (see VectorRetriever).
+    """
+    if embedding_backend == "onnx":
+        # Only the ONNX backend needs onnxruntime
+        from src.retrieval.onnx_embeddings import OnnxEmbeddings
+
+        logger.info("Initializing ONNX embedding function for retrieval")
+        return OnnxEmbeddings(onnx_model_dir, quantized=onnx_quantized)
+
+    logger.info("Initializing embedding function for retrieval")
+    return HuggingFaceEmbeddings(
+        model_name=model_name
+    )
+
+
 class VectorRetriever:
     def __init__(
         self,
@@ -15,6 +48,18 @@ class VectorRetriever:
         k: int = 5,
         strategy: str = "mmr",
         fetch_k: int = 20,
+        result_cache_size: int = 0,
+        backend: str = "chroma",
+        index_cache_dir: Optional[Path] = None,
+        index_mmap: bool = False,
+        lambda_mult: float = 0.5,
+        neighbor_graph_size: int = 0,
+        rrf_k: int = 60,
+        bm25_dir: Optional[Path] = None,
+        embeddings: Optional[Embeddings] = None,
+        embedding_backend: str = "torch",
+        onnx_model_dir: Optional[Path] = None,
+        onnx_quantized: bool = True,
     ):
         """
         Vector retriever with configurable retrieval strategy.
@@ -22,13 +67,49 @@ class VectorRetriever:
         strategy:
           - "mmr": Maximal Marginal Relevance
           - "similarity": Pure similarity search
+          - "hybrid": BM25 + dense similarity fused with reciprocal rank fusion
+            (BM25 index loaded from bm25_dir, default <vectorstore_dir>/bm25)
+
+        result_cache_size: entries in the exact-match result LRU (0 disables)
+
+        backend:
+          - "chroma": query the Chroma client directly
+          - "numpy": load all vectors into an in-memory NumPy index at startup
+            (persisted to / memory-mapped from index_cache_dir when given)
+
+        lambda_mult: MMR relevance/diversity trade-off (1.0 = pure relevance)
+        neighbor_graph_size: with the numpy backend, precompute each chunk's
+            top-N neighbors so MMR diversity penalties are lookups (0 = exact)
+        rrf_k: reciprocal rank fusion constant for the hybrid strategy
+        embeddings: already loaded embedding model to share between
+            retrievers (model_name is then only used as the cache key)
+
+        embedding_backend:
+          - "torch": sentence-transformers model_name on PyTorch
+          - "onnx": model_name exported to onnx_model_dir, run by onnxruntime
+            (int8 weights when onnx_quantized)
         """
 
-        logger.info("Initializing embedding function for retrieval")
+        self.vectorstore_dir = Path(vectorstore_dir)
 
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=model_name
-        )
+        # Querying with another model than the one that embedded the store
+        # silently degrades results, so refuse to start instead
+        model_key = embedding_model_key(model_name, embedding_backend, onnx_quantized)
+        stored_key = IngestionManifest.load(self.vectorstore_dir).settings.get("model_name")
+        if stored_key is not None and stored_key != model_key:
+            raise ValueError(
+                f"Vectorstore {self.vectorstore_dir} was embedded with {stored_key}, "
+                f"but retrieval is configured for {model_key}: rebuild the store "
+                f"or change retrieval.embedding_backend"
+            )
+
+        if embeddings is not None:
+            logger.info("Using shared embedding function for retrieval")
+            self.embeddings = embeddings
+        else:
+            self.embeddings = load_embeddings(
+                model_name, embedding_backend, onnx_model_dir, onnx_quantized
+            )
 
         logger.info("Loading Chroma vectorstore from disk")
 
@@ -40,26 +121,333 @@ class VectorRetriever:
         self.k = k
         self.fetch_k = fetch_k
         self.strategy = strategy
+        self.lambda_mult = lambda_mult
+        self.neighbor_graph_size = neighbor_graph_size
+        self.rrf_k = rrf_k
+        self.bm25: Optional[BM25Index] = None
+
+        self.result_cache = (
+            RetrievalResultCache(result_cache_size) if result_cache_size > 0 else None
+        )
 
         if strategy == "mmr":
             logger.info("Using MMR retrieval strategy")
-            self.retriever = self.vectorstore.as_retriever(
-                search_type="mmr",
-                search_kwargs={"k": k, "fetch_k": fetch_k},
-            )
         elif strategy == "similarity":
             logger.info("Using similarity retrieval strategy")
-            self.retriever = self.vectorstore.as_retriever(
-                search_type="similarity",
-                search_kwargs={"k": k},
+        elif strategy == "hybrid":
+            logger.info("Using hybrid BM25 + dense retrieval strategy")
+            self.bm25 = BM25Index.load(
+                Path(bm25_dir) if bm25_dir else self.vectorstore_dir / BM25_DIRNAME
             )
         else:
             raise ValueError(
                 f"Unsupported retrieval strategy: {strategy}"
             )
 
-    def retrieve(self, query: str):
+        self.backend = backend
+        self.index: Optional[NumpyVectorIndex] = None
+
+        self._index_cache_dir = index_cache_dir
+        self._index_mmap = index_mmap
+        self._index_version: Optional[str] = None
+        self._index_lock = threading.Lock()
+
+        if backend == "numpy":
+            logger.info("Using NumPy index backend")
+            self._refresh_index()
+        elif backend != "chroma":
+            raise ValueError(
+                f"Unsupported retrieval backend: {backend}"
+            )
+
+    @classmethod
+    def from_config(
+        cls,
+        retrieval: dict,
+        vectorstore_dir: Path,
+        model_name: str,
+        embeddings: Optional[Embeddings] = None,
+    ) -> "VectorRetriever":
+        """
+        Build a retriever from a `retrieval` config section (k and strategy
+        required, every other key optional with the constructor's default).
+        """
+        return cls(
+            vectorstore_dir=vectorstore_dir,
+            model_name=model_name,
+            k=retrieval["k"],
+            strategy=retrieval["strategy"],
+            fetch_k=retrieval.get("fetch_k", 20),
+            result_cache_size=retrieval.get("result_cache_size", 0),
+            backend=retrieval.get("backend", "chroma"),
+            index_cache_dir=retrieval.get("index_cache_dir"),
+            index_mmap=retrieval.get("index_mmap", False),
+            lambda_mult=retrieval.get("lambda_mult", 0.5),
+            neighbor_graph_size=retrieval.get("neighbor_graph_size", 0),
+            rrf_k=retrieval.get("rrf_k", 60),
+            embeddings=embeddings,
+            embedding_backend=retrieval.get("embedding_backend", "torch"),
+            onnx_model_dir=retrieval.get("onnx_model_dir"),
+            onnx_quantized=retrieval.get("onnx_quantized", True),
+        )
+
+    def collection_version(self) -> str:
+        """
+        Cheap fingerprint of the persisted vectorstore content.
+        Changes whenever Chroma writes to its SQLite file.
+        """
+        sqlite_path = self.vectorstore_dir / "chroma.sqlite3"
+        if not sqlite_path.exists():
+            return "missing"
+
+        stat = sqlite_path.stat()
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+    def embed_query(self, query: str) -> List[float]:
+        t_start = time.perf_counter()
+        embedding = self.embeddings.embed_query(query)
+        metrics.EMBEDDING_SECONDS.observe(time.perf_counter() - t_start)
+        return embedding
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Encode many queries in one model call.
+        MiniLM embeds queries and documents the same way, so this matches
+        per-query embed_query results.
+        """
+        t_start = time.perf_counter()
+        embeddings = self.embeddings.embed_documents(queries)
+
+        per_query = (time.perf_counter() - t_start) / max(len(queries), 1)
+        for _ in queries:
+            metrics.EMBEDDING_SECONDS.observe(per_query)
+        return embeddings
+
+    def cached_retrieve(self, query: str) -> Optional[List[Document]]:
+        """
+        Result-cache lookup alone, so callers that embed the query
+        themselves can skip the embedding on a hit. None on a miss.
+        """
+        return self._cached_documents(query)
+
+    def retrieve_by_vector(
+        self,
+        embedding: List[float],
+        query: Optional[str] = None,
+    ) -> List[Document]:
+        """
+        Run the vector search for an already computed query embedding.
+        Lets callers batch the embedding step across requests.
+        Pass `query` to consult and fill the result cache.
+        """
+        if query is not None:
+            cached = self._cached_documents(query)
+            if cached is not None:
+                return cached
+
+        t_start = time.perf_counter()
+        docs, scores = self._search(embedding, query)
+        search_time = time.perf_counter() - t_start
+        metrics.SEARCH_SECONDS.observe(search_time)
+
+        if query is not None:
+            self._remember(query, docs, scores, search_time)
+
+        logger.info(f"Retrieved {len(docs)} documents")
+        return docs
+
+    def retrieve_batch_by_vector(
+        self,
+        embeddings: List[List[float]],
+        queries: Optional[List[str]] = None,
+    ) -> List[List[Document]]:
+        """
+        Vector search for many queries at once.
+        The numpy backend answers the whole batch with single matrix products.
+        `queries` is required for the hybrid strategy.
+        """
+        t_start = time.perf_counter()
+        results = self._search_batch(embeddings, queries)
+
+        per_query = (time.perf_counter() - t_start) / max(len(results), 1)
+        for _ in results:
+            metrics.SEARCH_SECONDS.observe(per_query)
+
+        logger.info(f"Retrieved documents for {len(results)} queries")
+        return [docs for docs, _ in results]
+
+    def retrieve(self, query: str) -> List[Document]:
         logger.info(f"Running retrieval for query: {query}")
-        docs = self.retriever.invoke(query)
+
+        cached = self._cached_documents(query)
+        if cached is not None:
+            return cached
+
+        t_start = time.perf_counter()
+        embedding = self.embed_query(query)
+
+        t_search_start = time.perf_counter()
+        docs, scores = self._search(embedding, query)
+        metrics.SEARCH_SECONDS.observe(time.perf_counter() - t_search_start)
+
+        # A later hit skips the embedding as well, so count it in the cost
+        self._remember(query, docs, scores, time.perf_counter() - t_start)
+
         logger.info(f"Retrieved {len(docs)} documents")
         return docs
+
+    # ---------------------------
+    # Internals
+    # ---------------------------
+    def _refresh_index(self) -> None:
+        """
+        (Re)load the NumPy index when the persisted vectorstore changed.
+        """
+        version = self.collection_version()
+        if version == self._index_version:
+            return
+
+        with self._index_lock:
+            if version == self._index_version:
+                return
+
+            self.index = NumpyVectorIndex.from_chroma(
+                self.vectorstore,
+                cache_dir=self._index_cache_dir,
+                version=version,
+                mmap=self._index_mmap,
+            )
+            if self.neighbor_graph_size > 0:
+                self.index.build_neighbor_graph(self.neighbor_graph_size)
+            self._index_version = version
+
+    def _search(
+        self,
+        embedding: List[float],
+        query: Optional[str] = None,
+    ) -> Tuple[List[Document], List[Optional[float]]]:
+        if self.strategy == "hybrid":
+            return self._hybrid_search(embedding, query)
+
+        if self.index is not None:
+            return self._search_batch([embedding])[0]
+
+        if self.strategy == "mmr":
+            docs = self.vectorstore.max_marginal_relevance_search_by_vector(
+                embedding, k=self.k, fetch_k=self.fetch_k, lambda_mult=self.lambda_mult
+            )
+            return docs, [None] * len(docs)
+
+        return self._similarity_search(embedding, self.k)
+
+    def _search_batch(
+        self,
+        embeddings: List[List[float]],
+        queries: Optional[List[str]] = None,
+    ) -> List[Tuple[List[Document], List[Optional[float]]]]:
+        if self.index is None or self.strategy == "hybrid":
+            queries = queries or [None] * len(embeddings)
+            return [
+                self._search(embedding, query)
+                for embedding, query in zip(embeddings, queries)
+            ]
+
+        self._refresh_index()
+
+        if self.strategy == "mmr":
+            results = self.index.max_marginal_relevance_search_batch(
+                embeddings, k=self.k, fetch_k=self.fetch_k, lambda_mult=self.lambda_mult
+            )
+            return [(docs, [None] * len(docs)) for docs in results]
+        return self.index.similarity_search_batch(embeddings, k=self.k)
+
+    def _similarity_search(
+        self,
+        embedding: List[float],
+        k: int,
+    ) -> Tuple[List[Document], List[Optional[float]]]:
+        if self.index is not None:
+            self._refresh_index()
+            return self.index.similarity_search(embedding, k=k)
+
+        docs_and_scores = self.vectorstore.similarity_search_by_vector_with_relevance_scores(
+            embedding, k=k
+        )
+        return [d for d, _ in docs_and_scores], [s for _, s in docs_and_scores]
+
+    def _hybrid_search(
+        self,
+        embedding: List[float],
+        query: Optional[str],
+    ) -> Tuple[List[Document], List[Optional[float]]]:
+        if query is None:
+            raise ValueError("Hybrid retrieval requires the query text")
+
+        dense_docs, _ = self._similarity_search(embedding, self.fetch_k)
+        sparse_ids, _ = self.bm25.search(query, self.fetch_k)
+
+        fused = reciprocal_rank_fusion(
+            [[d.id for d in dense_docs], sparse_ids], self.rrf_k
+        )[: self.k]
+
+        by_id = {d.id: d for d in dense_docs}
+        missing = [doc_id for doc_id in fused if doc_id not in by_id]
+        if missing:
+            by_id.update(self._documents_by_id(missing))
+
+        docs = [by_id[doc_id] for doc_id in fused if doc_id in by_id]
+        return docs, [None] * len(docs)
+
+    def _cache_key(self, query: str) -> tuple:
+        return (
+            normalize_query(query),
+            self.strategy,
+            self.k,
+            self.fetch_k,
+            self.lambda_mult,
+            self.rrf_k,
+            self.collection_version(),
+        )
+
+    def _remember(
+        self,
+        query: str,
+        docs: List[Document],
+        scores: List[Optional[float]],
+        cost_seconds: float,
+    ) -> None:
+        if self.result_cache is not None:
+            self.result_cache.put(
+                self._cache_key(query), [d.id for d in docs], scores, cost_seconds
+            )
+
+    def _cached_documents(self, query: str) -> Optional[List[Document]]:
+        if self.result_cache is None:
+            return None
+
+        cached = self.result_cache.get(self._cache_key(query))
+        if cached is None:
+            return None
+
+        ids, _ = cached
+        by_id = self._documents_by_id(ids)
+
+        # A chunk vanished without a version bump: fall back to a fresh search
+        if len(by_id) != len(ids):
+            return None
+
+        metrics.RETRIEVAL_CACHE_HITS.inc()
+        logger.info(f"Retrieved {len(ids)} documents (result cache hit)")
+        return [by_id[doc_id] for doc_id in ids]
+
+    def _documents_by_id(self, ids: List[str]) -> Dict[str, Document]:
+        if self.index is not None:
+            return {d.id: d for d in self.index.get(ids)}
+
+        result = self.vectorstore.get(ids=ids, include=["documents", "metadatas"])
+        return {
+            doc_id: Document(page_content=text, metadata=metadata or {}, id=doc_id)
+            for doc_id, text, metadata in zip(
+                result["ids"], result["documents"], result["metadatas"]
+            )
+        }
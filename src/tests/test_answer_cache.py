@@ -0,0 +1,39 @@
+from src.rag.cache import SemanticAnswerCache
+
+
+def test_similar_query_hits_and_counts():
+    cache = SemanticAnswerCache(similarity_threshold=0.9)
+
+    assert cache.lookup([1.0, 0.0], "v1") is None
+    cache.store([1.0, 0.0], [55], "Acne is a skin disease (Page 55)", "v1")
+
+    hit = cache.lookup([0.99, 0.05], "v1")
+    assert hit is not None
+    assert hit.pages == [55]
+    assert cache.lookup([0.0, 1.0], "v1") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_lru_eviction_and_version_invalidation():
+    cache = SemanticAnswerCache(similarity_threshold=0.99, max_entries=2)
+
+    cache.store([1.0, 0.0, 0.0], [1], "a", "v1")
+    cache.store([0.0, 1.0, 0.0], [2], "b", "v1")
+    assert cache.lookup([1.0, 0.0, 0.0], "v1") is not None
+    cache.store([0.0, 0.0, 1.0], [3], "c", "v1")
+
+    assert cache.lookup([0.0, 1.0, 0.0], "v1") is None
+    assert cache.lookup([1.0, 0.0, 0.0], "v1") is not None
+
+    assert cache.lookup([1.0, 0.0, 0.0], "v2") is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_ttl_expiry():
+    cache = SemanticAnswerCache(ttl_seconds=0.0)
+
+    cache.store([1.0, 0.0], [1], "a", "v1")
+
+    assert cache.lookup([1.0, 0.0], "v1") is None
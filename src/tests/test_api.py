@@ -0,0 +1,210 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.documents import Document
+
+from src.api.main import app
+from src.api.streaming import ClosingStreamingResponse, coalesce
+from src.core import metrics
+from src.rag.chain import RAGChain, USE_DUMMY_LLM
+from src.retrieval.executor import RetrievalExecutor
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """
+    Install a RAGChain over a fake retriever on app.state, without running
+    the real lifespan. monkeypatch restores app.state after the test.
+    """
+    executors = []
+
+    def install(retriever, config=None):
+        executor = RetrievalExecutor(max_workers=1, max_pending=4)
+        executors.append(executor)
+        state = {
+            "config": config or {},
+            "executor": executor,
+            "rag_chain": RAGChain(retriever, executor=executor),
+            "single_flight": None,
+        }
+        for name, value in state.items():
+            monkeypatch.setattr(app.state, name, value, raising=False)
+
+    yield install
+
+    for executor in executors:
+        executor.shutdown()
+
+
+@pytest.mark.skipif(not USE_DUMMY_LLM, reason="requires USE_DUMMY_LLM=true")
+def test_stream_emits_json_lines_with_timing_trailer(serve):
+    class FakeRetriever:
+        def retrieve(self, query):
+            return [Document(page_content="Acne is a skin disease", metadata={"page": 55})]
+
+    serve(FakeRetriever())
+
+    response = client.get("/rag/stream", params={"question": "What is acne?"})
+    sse = client.get(
+        "/rag/stream",
+        params={"question": "What is acne?"},
+        headers={"Accept": "text/event-stream"},
+    )
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [e["type"] for e in events] == ["sources", "token", "metrics", "done"]
+    assert events[0]["sources"] == [{"page": 55, "source": None}]
+    assert events[1]["text"] == "CI dummy response"
+    assert {"retrieval_time", "prompt_time", "ttft", "llm_time", "tokens", "e2e_time"} <= events[2].keys()
+
+    assert sse.headers["content-type"].startswith("text/event-stream")
+    assert [line for line in sse.text.splitlines() if line.startswith("event:")] == [
+        "event: sources", "event: token", "event: metrics", "event: done",
+    ]
+
+
+def test_coalesce_merges_tokens_but_sends_first_immediately():
+    async def tokens():
+        for piece in (b"a", b"b", b"c", b"d"):
+            yield piece
+        await asyncio.sleep(0.05)
+        yield b"e"
+
+    async def collect(**limits):
+        return [chunk async for chunk in coalesce(tokens(), **limits)]
+
+    assert asyncio.run(collect()) == [b"a", b"b", b"c", b"d", b"e"]
+    assert asyncio.run(collect(flush_bytes=2)) == [b"a", b"bc", b"de"]
+    # The time limit flushes "bcd" while the producer is stalled
+    assert asyncio.run(collect(flush_ms=10)) == [b"a", b"bcd", b"e"]
+
+
+@pytest.mark.skipif(not USE_DUMMY_LLM, reason="requires USE_DUMMY_LLM=true")
+def test_batch_endpoint_answers_in_order_and_dedupes_questions(serve):
+    class BatchRetriever:
+        result_cache = None
+        embedded = []
+
+        def embed_queries(self, queries):
+            self.embedded.extend(queries)
+            return [[float(len(q)), 1.0] for q in queries]
+
+        def retrieve_batch_by_vector(self, embeddings, queries=None):
+            return [
+                [Document(page_content=q, metadata={"page": i}, id=str(i))]
+                for i, q in enumerate(queries)
+            ]
+
+    retriever = BatchRetriever()
+    serve(retriever)
+
+    questions = ["What is acne?", "what is  ACNE?", "What is asthma?"]
+    response = client.post("/rag/batch", json={"questions": questions})
+
+    body = response.json()
+
+    assert response.status_code == 200
+    assert retriever.embedded == ["What is acne?", "What is asthma?"]
+    assert [r["question"] for r in body["results"]] == questions
+    assert body["results"][1]["sources"] == body["results"][0]["sources"]
+    assert body["results"][2]["sources"] == [{"page": 1, "source": None}]
+    assert body["timings"]["unique_questions"] == 2
+
+
+def test_stream_generator_is_closed_when_client_disconnects():
+    closed = asyncio.Event()
+
+    async def endless():
+        try:
+            while True:
+                yield b"token "
+                await asyncio.sleep(0.01)
+        finally:
+            closed.set()
+
+    async def run():
+        sent = []
+
+        async def receive():
+            await asyncio.sleep(0.05)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "asgi": {"spec_version": "2.3"}}
+        await ClosingStreamingResponse(endless())(scope, receive, send)
+        return sent
+
+    sent = asyncio.run(run())
+
+    assert closed.is_set()
+    assert not any(m.get("more_body") is False for m in sent)
+
+
+def test_disconnect_mid_stream_aborts_generation(serve):
+    class FakeRetriever:
+        def retrieve(self, query):
+            return [Document(page_content="Acne is a skin disease", metadata={"page": 55})]
+
+    serve(FakeRetriever())
+    rag_chain = app.state.rag_chain
+    closed = []
+
+    async def slow_tokens(messages, timings):
+        try:
+            for i in range(100):
+                await asyncio.sleep(0.01)
+                yield f"token{i} "
+        finally:
+            closed.append(True)
+
+    rag_chain.streaming_enabled = True
+    rag_chain.max_tokens = 100
+    rag_chain._stream_tokens = slow_tokens
+
+    before = {
+        counter: counter.value
+        for counter in (
+            metrics.GENERATIONS_CANCELLED, metrics.TOKENS_SAVED, metrics.STREAMS_CANCELLED,
+        )
+    }
+
+    async def run():
+        async def receive():
+            await asyncio.sleep(0.1)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            pass
+
+        scope = {
+            "type": "http",
+            "asgi": {"spec_version": "2.3"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/rag/stream",
+            "raw_path": b"/rag/stream",
+            "root_path": "",
+            "query_string": b"question=What+is+acne",
+            "headers": [],
+            "server": ("testserver", 80),
+            "client": ("testclient", 50000),
+        }
+        await app(scope, receive, send)
+
+    asyncio.run(run())
+
+    saved = metrics.TOKENS_SAVED.value - before[metrics.TOKENS_SAVED]
+    assert closed == [True]
+    assert metrics.GENERATIONS_CANCELLED.value == before[metrics.GENERATIONS_CANCELLED] + 1
+    assert metrics.STREAMS_CANCELLED.value == before[metrics.STREAMS_CANCELLED] + 1
+    # Only a handful of the 100 tokens were generated before the disconnect
+    assert 50 < saved < 100
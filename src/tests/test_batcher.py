@@ -0,0 +1,59 @@
+import asyncio
+
+from langchain_core.embeddings import Embeddings
+
+from src.retrieval.batcher import QueryEmbeddingBatcher
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_concurrent_queries_share_one_encode():
+    embeddings = CountingEmbeddings()
+    batcher = QueryEmbeddingBatcher(embeddings, max_batch_size=8, max_wait_ms=20)
+
+    async def run():
+        queries = ["a", "bb", "ccc", "bb"]
+        return await asyncio.gather(*(batcher.embed(q) for q in queries))
+
+    vectors = asyncio.run(run())
+
+    assert vectors == [[1.0], [2.0], [3.0], [2.0]]
+    assert embeddings.batches == [["a", "bb", "ccc"]]
+
+
+def test_full_batch_flushes_without_waiting():
+    embeddings = CountingEmbeddings()
+    batcher = QueryEmbeddingBatcher(embeddings, max_batch_size=2, max_wait_ms=10_000)
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(batcher.embed("x"), batcher.embed("yy")), timeout=5
+        )
+
+    assert asyncio.run(run()) == [[1.0], [2.0]]
+
+
+def test_encode_tasks_are_referenced_until_done():
+    embeddings = CountingEmbeddings()
+    batcher = QueryEmbeddingBatcher(embeddings, max_batch_size=1)
+
+    async def run():
+        request = asyncio.create_task(batcher.embed("x"))
+        await asyncio.sleep(0)
+        assert len(batcher._tasks) == 1
+
+        vector = await request
+        await asyncio.sleep(0)
+        return vector, len(batcher._tasks)
+
+    assert asyncio.run(run()) == ([1.0], 0)
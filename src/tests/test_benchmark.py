@@ -0,0 +1,10 @@
+from src.evaluation.benchmark import latency_stats
+
+
+def test_latency_stats_percentiles_in_ms():
+    stats = latency_stats([i / 1000 for i in range(1, 101)])
+
+    assert abs(stats["p50_ms"] - 50.5) < 1e-6
+    assert abs(stats["p90_ms"] - 90.1) < 1e-6
+    assert stats["max_ms"] == 100.0
+    assert latency_stats([]) == {}
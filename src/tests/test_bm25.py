@@ -0,0 +1,31 @@
+from pathlib import Path
+
+from src.retrieval.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("What is Acne?") == ["acne"]
+
+
+def test_bm25_ranks_exact_term_matches_and_roundtrips(tmp_path: Path):
+    texts = [
+        "Acne is a skin disease with pimples",
+        "Hypertension is high blood pressure",
+        "Metformin treats type 2 diabetes",
+    ]
+    index = BM25Index.build(["a", "b", "c"], texts)
+
+    assert index.search("metformin dosage", k=2) == (["c"], index.search("metformin", k=2)[1])
+
+    index.save(tmp_path / "bm25")
+    loaded = BM25Index.load(tmp_path / "bm25", mmap=True)
+
+    assert loaded.search("blood pressure", k=1)[0] == ["b"]
+    assert loaded.search("unknownterm", k=3) == ([], [])
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["x", "y", "z"], ["y", "w"]], rrf_k=60)
+
+    assert fused[0] == "y"
+    assert set(fused) == {"x", "y", "z", "w"}
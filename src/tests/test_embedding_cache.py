@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.retrieval.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.encoded = []
+
+    def embed_documents(self, texts):
+        self.encoded.extend(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_only_new_text_is_encoded_across_runs(tmp_path: Path):
+    model = CountingEmbeddings()
+    cached = CachedEmbeddings(model, EmbeddingCache(tmp_path, "all-MiniLM-L6-v2"))
+
+    first = cached.embed_documents(["acne", "asthma  attack"])
+
+    # New process: cache reloaded from disk, whitespace-normalized keys
+    reopened = CachedEmbeddings(model, EmbeddingCache(tmp_path, "all-MiniLM-L6-v2"))
+    second = reopened.embed_documents(["asthma attack", "anemia", "acne"])
+
+    assert model.encoded == ["acne", "asthma  attack", "anemia"]
+    assert second[0] == first[1]
+    assert second[2] == first[0]
+    assert reopened.hits == 2 and reopened.misses == 1
+
+
+def test_cache_is_per_model(tmp_path: Path):
+    model = CountingEmbeddings()
+
+    CachedEmbeddings(model, EmbeddingCache(tmp_path, "model-a")).embed_documents(["acne"])
+    CachedEmbeddings(model, EmbeddingCache(tmp_path, "model-b")).embed_documents(["acne"])
+
+    assert model.encoded == ["acne", "acne"]
+
+
+def test_rows_left_by_an_interrupted_write_are_not_misattributed(tmp_path: Path):
+    cache = EmbeddingCache(tmp_path, "all-MiniLM-L6-v2")
+    cache.put_many(["a"], [[1.0, 0.0]])
+
+    # Crash after the vectors were appended but before their keys were
+    with cache._vectors_path.open("ab") as f:
+        f.write(np.asarray([[9.0, 9.0]], dtype=np.float32).tobytes())
+
+    reopened = EmbeddingCache(tmp_path, "all-MiniLM-L6-v2")
+    reopened.put_many(["b"], [[0.0, 1.0]])
+
+    assert EmbeddingCache(tmp_path, "all-MiniLM-L6-v2").get_many(["a", "b"]) == {
+        "a": [1.0, 0.0],
+        "b": [0.0, 1.0],
+    }
+
+
+def test_read_only_cache_is_consulted_but_never_grows(tmp_path: Path):
+    model = CountingEmbeddings()
+    CachedEmbeddings(model, EmbeddingCache(tmp_path, "all-MiniLM-L6-v2")).embed_documents(["acne"])
+
+    serving = CachedEmbeddings(model, EmbeddingCache(tmp_path, "all-MiniLM-L6-v2"), read_only=True)
+    serving.embed_documents(["acne", "what is acne?"])
+    serving.embed_query("what is asthma?")
+
+    assert serving.hits == 1
+    assert len(EmbeddingCache(tmp_path, "all-MiniLM-L6-v2")) == 1
@@ -1,4 +1,6 @@
-from src.evaluation.metrics import recall, precision, citation_accuracy
+import numpy as np
+
+from src.evaluation.metrics import recall, precision, citation_accuracy, retrieval_metrics
 
 def test_recall():
     assert recall([1,2,3], [2]) == 1.0
@@ -9,4 +11,17 @@ def test_precision():
 
 def test_citation_accuracy():
     assert citation_accuracy([2], [1,2,3]) == 1.0
-    assert citation_accuracy([4], [1,2,3]) == 0.0
\ No newline at end of file
+    assert citation_accuracy([4], [1,2,3]) == 0.0
+
+
+def test_retrieval_metrics_batch():
+    metrics = retrieval_metrics(
+        [[1, 2, 3], [4, 4, 5], []],
+        [[2], [4], [9]],
+    )
+
+    assert metrics["recall"] == (1 + 1 + 0) / 3
+    assert abs(metrics["precision"] - (1/3 + 2/3 + 0) / 3) < 1e-9
+    assert metrics["mrr"] == (1/2 + 1 + 0) / 3
+    # Repeated chunks from one relevant page are not double counted
+    assert abs(metrics["ndcg"] - (1 / np.log2(3) + 1 + 0) / 3) < 1e-9
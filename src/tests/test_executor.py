@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.retrieval.executor import RetrievalExecutor, RetrievalPoolSaturated
+
+
+def test_executor_runs_blocking_work_off_loop():
+    executor = RetrievalExecutor(max_workers=1, max_pending=1)
+
+    result = asyncio.run(executor.run(threading.current_thread))
+
+    assert result is not threading.main_thread()
+    executor.shutdown()
+
+
+def test_executor_rejects_when_saturated():
+    executor = RetrievalExecutor(max_workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def run():
+        first = asyncio.create_task(executor.run(release.wait))
+        await asyncio.sleep(0)
+        assert executor.saturated
+
+        with pytest.raises(RetrievalPoolSaturated):
+            await executor.run(lambda: None)
+
+        release.set()
+        await first
+        assert executor.pending == 0
+
+    asyncio.run(run())
+    executor.shutdown()
+
+
+def test_cancelled_caller_keeps_running_job_pending():
+    executor = RetrievalExecutor(max_workers=1, max_pending=1)
+    started = threading.Event()
+    release = threading.Event()
+
+    def job():
+        started.set()
+        release.wait()
+
+    async def run():
+        caller = asyncio.create_task(executor.run(job))
+        await asyncio.to_thread(started.wait)
+
+        # Client went away, but the worker thread is still busy
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        assert executor.saturated
+
+        release.set()
+        for _ in range(100):
+            if executor.pending == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert executor.pending == 0
+
+    asyncio.run(run())
+    executor.shutdown()
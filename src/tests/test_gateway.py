@@ -0,0 +1,81 @@
+import asyncio
+
+import httpx
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from src.evaluation.fake_ollama import create_app
+from src.rag.gateway import LLMQueueFull, LLMQueueTimeout, OllamaGateway
+
+MESSAGES = [SystemMessage(content="Be brief."), HumanMessage(content="What is acne?")]
+
+
+def make_gateway(fake_app, **kwargs):
+    return OllamaGateway(
+        base_url="http://fake-ollama",
+        model="llama3.2",
+        transport=httpx.ASGITransport(app=fake_app),
+        **kwargs,
+    )
+
+
+def test_gateway_streams_tokens_from_fake_ollama():
+    fake_app = create_app(first_token_ms=0, token_ms=0, num_tokens=5)
+
+    async def run():
+        gateway = make_gateway(fake_app)
+        timings = {}
+        tokens = [t async for t in gateway.stream_chat(MESSAGES, timings)]
+        await gateway.aclose()
+        return tokens, timings
+
+    tokens, timings = asyncio.run(run())
+
+    assert len(tokens) == 5
+    assert "".join(tokens).startswith("Hypertension is")
+    assert timings["queue_time"] >= 0
+
+
+def test_gateway_limits_concurrency_and_queues_fifo():
+    fake_app = create_app(first_token_ms=30, token_ms=0, num_tokens=2)
+
+    async def run():
+        gateway = make_gateway(fake_app, max_concurrent=2, max_queue=8)
+        finished = []
+
+        async def ask(i):
+            timings = {}
+            await gateway.generate(MESSAGES, timings)
+            finished.append(i)
+            return timings["queue_time"]
+
+        queue_times = await asyncio.gather(*(ask(i) for i in range(6)))
+        await gateway.aclose()
+        return finished, queue_times
+
+    finished, queue_times = asyncio.run(run())
+
+    assert fake_app.state.max_active == 2
+    assert queue_times[0] < 0.01 and queue_times[-1] > 0.05
+    # Requests queued behind the first two are served in arrival order
+    assert finished[2:] == [2, 3, 4, 5]
+
+
+def test_gateway_rejects_when_queue_full_or_wait_too_long():
+    fake_app = create_app(first_token_ms=100, token_ms=0, num_tokens=1)
+
+    async def run():
+        gateway = make_gateway(fake_app, max_concurrent=1, max_queue=1, queue_timeout=0.02)
+
+        results = await asyncio.gather(
+            *(gateway.generate(MESSAGES) for _ in range(3)),
+            return_exceptions=True,
+        )
+        await gateway.aclose()
+        return results, gateway
+
+    results, gateway = asyncio.run(run())
+
+    assert isinstance(results[0], str)
+    assert isinstance(results[1], LLMQueueTimeout)
+    assert isinstance(results[2], LLMQueueFull)
+    assert gateway.active == 0 and gateway.queued == 0
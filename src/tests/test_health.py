@@ -1,5 +1,7 @@
 from fastapi.testclient import TestClient
+
 from src.api.main import app
+from src.core.metrics import Histogram
 
 client = TestClient(app)
 
@@ -7,4 +9,19 @@ client = TestClient(app)
 def test_health_check():
     response = client.get("/health")
     assert response.status_code == 200
-    assert response.json() == {"status": "ok"}
\ No newline at end of file
+    assert response.json() == {"status": "ok"}
+
+
+def test_metrics_endpoint_exposes_histograms():
+    histogram = Histogram("test_seconds", "Test", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+    lines = histogram.render()
+    assert 'test_seconds_bucket{le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 3' in lines
+    assert "test_seconds_count 3" in lines
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "# TYPE medwise_time_to_first_token_seconds histogram" in response.text
+    assert "medwise_streams_in_flight 0" in response.text
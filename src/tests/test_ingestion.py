@@ -1,7 +1,246 @@
+import threading
+from concurrent.futures import Future
 from pathlib import Path
 
+import pytest
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.evaluation import vectorstores
+from src.evaluation.vectorstores import corpus_hash, materialize_vectorstores, vectorstore_key
+from src.ingestion import embeddings as embeddings_module
+from src.ingestion.chunking import chunk_documents, iter_chunk_documents
+from src.ingestion.embeddings import add_chunks
+from src.ingestion.loaders.parallel_pdf_loader import iter_pdf_pages
 from src.ingestion.loaders.pdf_loader import load_pdf
+from src.ingestion.manifest import IngestionManifest
+from src.ingestion.pipeline import run_ingestion_pipeline
+from src.retrieval import onnx_embeddings
+
+
+def write_text_pdf(path: Path, pages: list) -> None:
+    """
+    Minimal uncompressed PDF with one line of Helvetica text per page.
+    """
+    n = len(pages)
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [%s] /Count %d >>"
+        % (" ".join(f"{4 + 2 * i} 0 R" for i in range(n)), n),
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(pages):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+
+    out = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n"
+
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    path.write_bytes(out.encode("latin-1"))
 
 
 def test_pdf_loader_exists(tmp_path: Path):
-    assert load_pdf is not None
\ No newline at end of file
+    assert load_pdf is not None
+
+
+def test_parallel_loader_yields_pages_in_order(tmp_path: Path):
+    pdf_path = tmp_path / "book.pdf"
+    write_text_pdf(pdf_path, ["Acne page", "AIDS page", "Asthma page"])
+
+    pages = list(iter_pdf_pages([pdf_path], workers=2, pages_per_task=1))
+
+    assert [p.metadata["page"] for p in pages] == [0, 1, 2]
+    assert pages[1].page_content == "AIDS page"
+    assert pages[0].metadata["total_pages"] == 3
+
+
+def test_streaming_chunking_matches_batch_chunking():
+    docs = [
+        Document(page_content="word " * 120, metadata={"page": 1}),
+        Document(page_content="term " * 80, metadata={"page": 2}),
+    ]
+
+    streamed = list(iter_chunk_documents(iter(docs), chunk_size=100, chunk_overlap=20))
+    batched = chunk_documents(docs, chunk_size=100, chunk_overlap=20)
+
+    assert streamed == batched
+
+
+def test_incremental_ingestion_only_embeds_deltas(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(
+        embeddings_module,
+        "HuggingFaceEmbeddings",
+        lambda model_name: DeterministicFakeEmbedding(size=8),
+    )
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    write_text_pdf(raw_dir / "a.pdf", ["Acne page", "AIDS page"])
+    write_text_pdf(raw_dir / "b.pdf", ["Asthma page"])
+    store_dir = tmp_path / "vectorstore"
+
+    def ingest():
+        return run_ingestion_pipeline(
+            sorted(raw_dir.glob("*.pdf")), store_dir, "fake", 100, 20, workers=1
+        )
+
+    assert len(ingest().get()["ids"]) == 3
+    first_ids = set(IngestionManifest.load(store_dir).chunk_ids("a.pdf"))
+
+    # Unchanged corpus: ids are deterministic and nothing is re-added
+    assert len(ingest().get()["ids"]) == 3
+
+    write_text_pdf(raw_dir / "a.pdf", ["Acne page", "Anemia page"])
+    (raw_dir / "b.pdf").unlink()
+
+    stored = ingest().get()
+    manifest = IngestionManifest.load(store_dir)
+
+    assert sorted(stored["documents"]) == ["Acne page", "Anemia page"]
+    assert list(manifest.files) == ["a.pdf"]
+    assert len(first_ids & set(manifest.chunk_ids("a.pdf"))) == 1
+
+
+def test_switching_embedding_backend_re_embeds_chunks(tmp_path: Path, monkeypatch):
+    encoded = {"torch": 0, "onnx": 0}
+
+    class CountingEmbedding(DeterministicFakeEmbedding):
+        backend: str = "torch"
+
+        def embed_documents(self, texts):
+            encoded[self.backend] += len(texts)
+            return super().embed_documents(texts)
+
+    monkeypatch.setattr(
+        embeddings_module,
+        "HuggingFaceEmbeddings",
+        lambda model_name: CountingEmbedding(size=8),
+    )
+    monkeypatch.setattr(
+        onnx_embeddings,
+        "OnnxEmbeddings",
+        lambda model_dir, quantized: CountingEmbedding(size=8, backend="onnx"),
+    )
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    write_text_pdf(raw_dir / "a.pdf", ["Acne page", "AIDS page"])
+    store_dir = tmp_path / "vectorstore"
+
+    def ingest(backend):
+        return run_ingestion_pipeline(
+            [raw_dir / "a.pdf"], store_dir, "m", 100, 20, workers=1,
+            embedding_backend=backend,
+        )
+
+    ingest("torch")
+    stored = ingest("onnx").get()
+
+    assert encoded == {"torch": 2, "onnx": 2}
+    assert len(stored["ids"]) == 2
+    assert IngestionManifest.load(store_dir).settings["model_name"] == "m@onnx-int8"
+
+
+def test_add_chunks_upserts_precomputed_vectors(tmp_path: Path):
+    vectorstore = Chroma(
+        embedding_function=DeterministicFakeEmbedding(size=8),
+        persist_directory=str(tmp_path),
+    )
+    chunks = (
+        Document(page_content="x" * (i % 7 + 1), metadata={"page": i}, id=f"c{i}")
+        for i in range(50)
+    )
+
+    added = add_chunks(
+        vectorstore, chunks, batch_size=8, encode_batch_size=16, encode_workers=2
+    )
+    stored = vectorstore.get(ids=["c3"], include=["documents", "metadatas"])
+
+    assert added == 50
+    assert len(vectorstore.get()["ids"]) == 50
+    assert stored["documents"] == ["x" * 4]
+    assert stored["metadatas"] == [{"page": 3}]
+
+
+def test_add_chunks_stops_encoding_when_an_upsert_fails(tmp_path: Path, monkeypatch):
+    class CountingEmbedding(DeterministicFakeEmbedding):
+        windows: int = 0
+
+        def embed_documents(self, texts):
+            self.windows += 1
+            return super().embed_documents(texts)
+
+    embedding = CountingEmbedding(size=8)
+    vectorstore = Chroma(embedding_function=embedding, persist_directory=str(tmp_path))
+
+    def failing_upsert(vectorstore, docs, vectors):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(embeddings_module, "_upsert", failing_upsert)
+    chunks = (Document(page_content=f"chunk {i}", id=f"c{i}") for i in range(1000))
+
+    with pytest.raises(RuntimeError, match="disk full"):
+        add_chunks(vectorstore, chunks, batch_size=8, encode_batch_size=10, encode_workers=2)
+
+    # Producers were stopped, not left encoding the remaining 99 windows
+    assert embedding.windows < 10
+    assert not any(t.name.startswith("encode-") for t in threading.enumerate())
+
+
+def test_experiment_vectorstore_key_depends_on_chunking_only(tmp_path):
+    pdf = tmp_path / "a.pdf"
+    write_text_pdf(pdf, ["Aspirin reduces fever."])
+    source = corpus_hash([pdf])
+
+    base = {"chunk_size": 800, "chunk_overlap": 200}
+    same = {"chunk_size": 800, "chunk_overlap": 200, "strategy": "ignored"}
+    other = {"chunk_size": 1000, "chunk_overlap": 200}
+
+    assert vectorstore_key(base, "m", source) == vectorstore_key(same, "m", source)
+    assert vectorstore_key(base, "m", source) != vectorstore_key(other, "m", source)
+    assert vectorstore_key(base, "m", source) != vectorstore_key(base, "m", "changed")
+
+
+def test_experiment_vectorstores_are_keyed_on_embedding_backend(tmp_path, monkeypatch):
+    class InlinePool:
+        def __init__(self, max_workers, mp_context):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def submit(self, fn, *args):
+            future = Future()
+            future.set_result(fn(*args))
+            return future
+
+    built = []
+    monkeypatch.setattr(vectorstores, "ProcessPoolExecutor", InlinePool)
+    monkeypatch.setattr(
+        vectorstores, "_build", lambda pdfs, persist_dir, *args: built.append(persist_dir)
+    )
+    pdf = tmp_path / "a.pdf"
+    write_text_pdf(pdf, ["Aspirin reduces fever."])
+    chunking = {"chunk_size": 800, "chunk_overlap": 200}
+    configs = {
+        "torch": {"chunking": chunking, "ingestion": {"embedding_backend": "torch"}},
+        "onnx": {"chunking": chunking, "ingestion": {"embedding_backend": "onnx"}},
+    }
+
+    dirs = materialize_vectorstores(configs, [pdf], "m", root_dir=tmp_path / "stores")
+
+    assert dirs["torch"] != dirs["onnx"]
+    assert len(built) == 2
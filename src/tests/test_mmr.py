@@ -0,0 +1,48 @@
+import numpy as np
+from langchain_chroma.vectorstores import maximal_marginal_relevance
+
+from src.retrieval.mmr import batched_mmr, build_neighbor_graph
+
+
+def test_batched_mmr_matches_langchain():
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(50, 8)).astype(np.float32)
+    queries = rng.normal(size=(4, 8)).astype(np.float32)
+    candidates = np.stack([rng.choice(50, size=10, replace=False) for _ in range(4)])
+
+    picks = batched_mmr(queries, candidates, embeddings, k=4, lambda_mult=0.5)
+
+    for query, query_candidates, query_picks in zip(queries, candidates, picks):
+        expected = maximal_marginal_relevance(
+            query, list(embeddings[query_candidates]), lambda_mult=0.5, k=4
+        )
+        assert list(query_picks) == expected
+
+
+def test_full_neighbor_graph_matches_dense_mmr():
+    rng = np.random.default_rng(1)
+    embeddings = rng.normal(size=(30, 8)).astype(np.float32)
+    queries = rng.normal(size=(3, 8)).astype(np.float32)
+    candidates = np.stack([rng.choice(30, size=8, replace=False) for _ in range(3)])
+
+    graph = build_neighbor_graph(embeddings, n_neighbors=29, block_size=7)
+
+    dense = batched_mmr(queries, candidates, embeddings, k=3, lambda_mult=0.3)
+    sparse = batched_mmr(
+        queries, candidates, embeddings, k=3, lambda_mult=0.3, neighbor_graph=graph
+    )
+
+    assert np.array_equal(dense, sparse)
+
+
+def test_neighbor_graph_on_empty_and_single_chunk_stores():
+    assert build_neighbor_graph(np.empty((0, 8)), n_neighbors=5)[0].shape == (0, 0)
+
+    embeddings = np.ones((1, 8), dtype=np.float32)
+    graph = build_neighbor_graph(embeddings, n_neighbors=5)
+    picks = batched_mmr(
+        embeddings, np.array([[0]]), embeddings, k=1, neighbor_graph=graph
+    )
+
+    assert graph[0].shape == (1, 0)
+    assert picks.tolist() == [[0]]
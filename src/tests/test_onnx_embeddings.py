@@ -0,0 +1,71 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from tokenizers import Tokenizer
+from tokenizers.models import WordLevel
+from tokenizers.pre_tokenizers import Whitespace
+
+from src.retrieval import onnx_embeddings
+from src.retrieval.onnx_embeddings import OnnxEmbeddings, mean_pool
+
+VOCAB = ["[PAD]", "[UNK]", "acne", "asthma", "attack", "anemia", "treatment"]
+
+
+class FakeSession:
+    """
+    Stands in for an onnxruntime session: hidden state = embedding table
+    lookup, so pooled vectors are easy to predict.
+    """
+
+    table = np.random.default_rng(0).normal(size=(len(VOCAB), 8)).astype(np.float32)
+
+    def __init__(self, path, options=None, providers=None):
+        self.path = path
+        self.feeds = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name="input_ids"), SimpleNamespace(name="attention_mask")]
+
+    def run(self, output_names, feeds):
+        self.feeds.append(feeds)
+        return [self.table[feeds["input_ids"]]]
+
+
+@pytest.fixture
+def model_dir(tmp_path: Path, monkeypatch) -> Path:
+    tokenizer = Tokenizer(WordLevel({t: i for i, t in enumerate(VOCAB)}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    tokenizer.save(str(tmp_path / "tokenizer.json"))
+
+    monkeypatch.setattr(onnx_embeddings.ort, "InferenceSession", FakeSession)
+    return tmp_path
+
+
+def test_mean_pool_ignores_padding_and_normalizes():
+    hidden = np.array([[[1.0, 0.0], [3.0, 4.0], [100.0, 100.0]]])
+    mask = np.array([[1, 1, 0]])
+
+    pooled = mean_pool(hidden, mask)
+
+    np.testing.assert_allclose(pooled, [[2.0 / np.hypot(2, 2), 2.0 / np.hypot(2, 2)]])
+
+
+def test_quantized_model_is_loaded(model_dir: Path):
+    assert OnnxEmbeddings(model_dir).session.path.endswith("model_quantized.onnx")
+    assert OnnxEmbeddings(model_dir, quantized=False).session.path.endswith("model.onnx")
+
+
+def test_batched_documents_match_single_queries(model_dir: Path):
+    embeddings = OnnxEmbeddings(model_dir, batch_size=2)
+    texts = ["asthma attack treatment", "acne", "anemia treatment"]
+
+    batched = embeddings.embed_documents(texts)
+    single = [embeddings.embed_query(t) for t in texts]
+
+    np.testing.assert_allclose(batched, single, atol=1e-6)
+    np.testing.assert_allclose(np.linalg.norm(batched, axis=1), 1.0, atol=1e-6)
+
+    # Only the inputs the exported graph declares are fed
+    assert set(embeddings.session.feeds[0]) == {"input_ids", "attention_mask"}
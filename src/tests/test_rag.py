@@ -1,4 +1,11 @@
-from src.rag.chain import RAGChain
+import asyncio
+
+import pytest
+from langchain_core.documents import Document
+
+from src.rag.cache import SemanticAnswerCache
+from src.rag.chain import RAGChain, USE_DUMMY_LLM
+from src.rag.context import ContextPacker, estimate_tokens
 from src.retrieval.retriever import VectorRetriever
 from pathlib import Path
 
@@ -12,4 +19,164 @@ def test_rag_chain_initializes():
 
     rag = RAGChain(retriever)
 
-    assert rag is not None
\ No newline at end of file
+    assert rag is not None
+
+
+@pytest.mark.skipif(not USE_DUMMY_LLM, reason="requires USE_DUMMY_LLM=true")
+def test_stream_answer_from_docs_reuses_retrieved_docs():
+    class CountingRetriever:
+        calls = 0
+
+        def retrieve(self, query):
+            self.calls += 1
+            return [Document(page_content="Acne is a skin disease", metadata={"page": 55})]
+
+    retriever = CountingRetriever()
+    rag = RAGChain(retriever)
+
+    async def run():
+        timings = {}
+        docs = rag.retrieve("What is acne?", timings)
+        chunks = [
+            chunk
+            async for chunk in rag.stream_answer_from_docs("What is acne?", docs, timings)
+        ]
+        return chunks, timings
+
+    chunks, timings = asyncio.run(run())
+
+    assert retriever.calls == 1
+    assert b"".join(chunks)
+    assert {"retrieval_time", "prompt_time", "llm_time"} <= timings.keys()
+
+
+@pytest.mark.skipif(not USE_DUMMY_LLM, reason="requires USE_DUMMY_LLM=true")
+def test_stream_answer_replays_cached_answer():
+    class VectorOnlyRetriever:
+        searches = 0
+
+        def embed_query(self, query):
+            return [1.0, 0.0]
+
+        def retrieve_by_vector(self, embedding, query=None):
+            self.searches += 1
+            return [Document(page_content="Acne is a skin disease", metadata={"page": 55})]
+
+        def collection_version(self):
+            return "v1"
+
+    retriever = VectorOnlyRetriever()
+    rag = RAGChain(retriever, answer_cache=SemanticAnswerCache())
+
+    async def ask():
+        timings = {}
+        chunks = [chunk async for chunk in rag.stream_answer("What is acne?", timings)]
+        return b"".join(chunks), timings
+
+    first, first_timings = asyncio.run(ask())
+    second, second_timings = asyncio.run(ask())
+
+    assert retriever.searches == 1
+    assert first == second
+    assert not first_timings["cache_hit"]
+    assert second_timings["cache_hit"]
+
+
+def test_context_packer_merges_overlap_dedupes_and_respects_budget():
+    first = "Acne is a skin disease. It affects hair follicles and oil glands of the skin."
+    second = "It affects hair follicles and oil glands of the skin. Treatment includes retinoids."
+    other_page = "Acne is a skin disease. Scarring can follow severe cases."
+
+    docs = [
+        Document(page_content=first, metadata={"page": 55}),
+        Document(page_content=second, metadata={"page": 55}),
+        Document(page_content=other_page, metadata={"page": 56}),
+    ]
+
+    packed = ContextPacker(num_ctx=10_000, num_predict=0).pack(docs)
+
+    assert packed.count("(Page 55)") == 1
+    assert packed.count("It affects hair follicles") == 1
+    assert packed.count("Acne is a skin disease.") == 1
+    assert "Treatment includes retinoids." in packed
+    assert "(Page 56) Scarring can follow severe cases." in packed
+
+    tight = ContextPacker(num_ctx=40, num_predict=0, safety_margin=0)
+    packed = tight.pack(docs)
+    assert estimate_tokens(packed) <= 40
+    assert packed.startswith("(Page 55) Acne is a skin disease.")
+
+
+def test_answer_batch_reports_failed_generation_per_question():
+    class BatchRetriever:
+        result_cache = None
+
+        def embed_queries(self, queries):
+            return [[float(len(q)), 1.0] for q in queries]
+
+        def retrieve_batch_by_vector(self, embeddings, queries=None):
+            return [[Document(page_content=q, metadata={"page": i})] for i, q in enumerate(queries)]
+
+    rag = RAGChain(BatchRetriever())
+
+    async def generate(question, docs, timings=None):
+        if "asthma" in question:
+            raise RuntimeError("ollama 500")
+        return f"Answer to {question} (Page 0)"
+
+    rag.agenerate_answer_from_docs = generate
+
+    results = asyncio.run(
+        rag.answer_batch(["What is acne?", "What is asthma?", "What is anemia?"])
+    )
+
+    assert [r["answer"] for r in results] == [
+        "Answer to What is acne? (Page 0)", None, "Answer to What is anemia? (Page 0)",
+    ]
+    assert results[1]["error"] == "ollama 500"
+    assert results[1]["cited_pages"] == []
+    assert "error" not in results[0] and "error" not in results[2]
+
+
+def test_result_cache_hit_skips_query_embedding():
+    acne = [Document(page_content="Acne is a skin disease", metadata={"page": 55})]
+
+    class CachingRetriever:
+        result_cache = object()
+        embedded = []
+
+        def cached_retrieve(self, query):
+            return acne if "acne" in query else None
+
+        def embed_queries(self, queries):
+            self.embedded.extend(queries)
+            return [[1.0, 0.0] for _ in queries]
+
+        def retrieve_batch_by_vector(self, embeddings, queries=None):
+            return [[Document(page_content=q, metadata={"page": 1})] for q in queries]
+
+    class FailingBatcher:
+        async def embed(self, query):
+            raise AssertionError("query should not be embedded")
+
+    retriever = CachingRetriever()
+    rag = RAGChain(retriever, batcher=FailingBatcher())
+
+    async def generate(question, docs, timings=None):
+        return "answer"
+
+    rag.agenerate_answer_from_docs = generate
+
+    async def run():
+        timings = {}
+        docs = await rag.aretrieve("What is acne?", timings)
+        results = await rag.answer_batch(["What is acne?", "What is asthma?"])
+        return docs, timings, results
+
+    docs, timings, results = asyncio.run(run())
+
+    assert docs == acne
+    assert "embedding_time" not in timings
+    assert retriever.embedded == ["What is asthma?"]
+    assert results[0]["sources"] == [{"page": 55, "source": None}]
+    assert results[1]["sources"] == [{"page": 1, "source": None}]
@@ -1,9 +1,15 @@
 from pathlib import Path
 
+import pytest
 from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
 
+from src.evaluation.run_all_experiments import MODEL_NAME, build_retriever
+from src.ingestion.manifest import IngestionManifest
+from src.retrieval.numpy_index import NumpyVectorIndex
+from src.retrieval.result_cache import RetrievalResultCache, normalize_query
 from src.retrieval.retriever import VectorRetriever
 
 
@@ -33,4 +39,129 @@ def test_retriever_returns_documents(tmp_path: Path):
 
     assert results is not None
     assert len(results) == 1
-    assert "Hypertension" in results[0].page_content
\ No newline at end of file
+    assert "Hypertension" in results[0].page_content
+
+
+def test_result_cache_normalizes_queries_and_evicts_lru():
+    cache = RetrievalResultCache(max_entries=1)
+
+    key = (normalize_query("What is  Acne?"), "mmr", 3, 20, "v1")
+    cache.put(key, ["id-1"], [None], 0.25)
+
+    assert cache.get((normalize_query("what is acne"), "mmr", 3, 20, "v1")) == (["id-1"], [None])
+    assert cache.get((normalize_query("what is acne"), "similarity", 3, 20, "v1")) is None
+
+    cache.put(("other", "mmr", 3, 20, "v1"), ["id-2"], [None], 0.1)
+    assert cache.get(key) is None
+    assert cache.stats()["saved_seconds"] == 0.25
+
+
+def test_numpy_index_matches_chroma_similarity(tmp_path: Path):
+    embeddings = DeterministicFakeEmbedding(size=16)
+    docs = [
+        Document(page_content=f"chunk {i}", metadata={"page": i}) for i in range(20)
+    ]
+    vectorstore = Chroma.from_documents(
+        documents=docs,
+        embedding=embeddings,
+        persist_directory=str(tmp_path / "vectorstore"),
+    )
+
+    index = NumpyVectorIndex.from_chroma(
+        vectorstore, cache_dir=tmp_path / "numpy", version="v1", mmap=True
+    )
+    query = embeddings.embed_query("chunk 7")
+
+    expected = vectorstore.similarity_search_by_vector(query, k=3)
+    results, scores = index.similarity_search(query, k=3)
+
+    assert [d.id for d in results] == [d.id for d in expected]
+    assert scores == sorted(scores)
+    assert len(index.max_marginal_relevance_search(query, k=3, fetch_k=10)) == 3
+
+
+def test_retriever_shares_injected_embeddings(tmp_path: Path):
+    embeddings = DeterministicFakeEmbedding(size=16)
+
+    docs = [
+        Document(page_content="Hypertension is high blood pressure", metadata={"page": 1}),
+        Document(page_content="Diabetes is a metabolic disorder", metadata={"page": 2}),
+    ]
+    Chroma.from_documents(docs, embedding=embeddings, persist_directory=str(tmp_path))
+
+    retrievers = [
+        VectorRetriever(
+            vectorstore_dir=tmp_path, model_name="fake", k=1,
+            strategy="similarity", embeddings=embeddings,
+        )
+        for _ in range(2)
+    ]
+    assert all(r.embeddings is embeddings for r in retrievers)
+
+    query = "Hypertension is high blood pressure"
+    results = retrievers[0].retrieve_batch_by_vector([embeddings.embed_query(query)], [query])
+    assert results[0][0].metadata["page"] == 1
+
+
+def test_retriever_refuses_store_embedded_by_another_backend(tmp_path: Path):
+    IngestionManifest({"model_name": "fake@onnx-int8"}, {}).save(tmp_path)
+    embeddings = DeterministicFakeEmbedding(size=16)
+
+    with pytest.raises(ValueError, match="embedded with fake@onnx-int8"):
+        VectorRetriever(vectorstore_dir=tmp_path, model_name="fake", embeddings=embeddings)
+
+    retriever = VectorRetriever(
+        vectorstore_dir=tmp_path, model_name="fake", embeddings=embeddings,
+        embedding_backend="onnx",
+    )
+    assert retriever.embeddings is embeddings
+
+
+def test_retriever_from_config_reads_every_retrieval_key(tmp_path: Path):
+    IngestionManifest({"model_name": "fake@onnx"}, {}).save(tmp_path / "store")
+    retrieval = {
+        "strategy": "mmr",
+        "k": 3,
+        "fetch_k": 12,
+        "lambda_mult": 0.7,
+        "neighbor_graph_size": 8,
+        "result_cache_size": 16,
+        "backend": "numpy",
+        "index_cache_dir": tmp_path / "index",
+        "embedding_backend": "onnx",
+        "onnx_quantized": False,
+    }
+
+    retriever = VectorRetriever.from_config(
+        retrieval, tmp_path / "store", "fake", embeddings=DeterministicFakeEmbedding(size=8)
+    )
+
+    assert (retriever.k, retriever.fetch_k, retriever.lambda_mult) == (3, 12, 0.7)
+    assert retriever.neighbor_graph_size == 8
+    assert retriever.result_cache is not None
+    assert retriever.index is not None
+
+
+def test_experiment_retriever_uses_the_ingestion_embedding_backend(tmp_path: Path):
+    IngestionManifest({"model_name": f"{MODEL_NAME}@onnx-int8"}, {}).save(tmp_path)
+    config = {
+        "retrieval": {"strategy": "similarity", "k": 3},
+        "ingestion": {"embedding_backend": "onnx", "onnx_quantized": True},
+    }
+
+    retriever = build_retriever(config, tmp_path, DeterministicFakeEmbedding(size=8))
+
+    assert retriever.k == 3
+
+
+def test_numpy_index_search_on_empty_store(tmp_path: Path):
+    vectorstore = Chroma(
+        embedding_function=DeterministicFakeEmbedding(size=8),
+        persist_directory=str(tmp_path),
+    )
+    index = NumpyVectorIndex.from_chroma(vectorstore)
+    query = DeterministicFakeEmbedding(size=8).embed_query("acne")
+
+    assert len(index) == 0
+    assert index.similarity_search(query, k=3) == ([], [])
+    assert index.max_marginal_relevance_search(query, k=3, fetch_k=10) == []
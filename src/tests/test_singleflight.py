@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from src.rag.singleflight import SingleFlight
+
+
+def test_concurrent_and_late_subscribers_share_one_generation():
+    starts = []
+
+    async def generate(flight):
+        starts.append(flight.key)
+        flight.sources.append({"page": 55})
+        for token in (b"Acne ", b"is ", b"common."):
+            await asyncio.sleep(0.01)
+            yield token
+
+    async def read(flight):
+        return b"".join([chunk async for chunk in flight.subscribe()])
+
+    async def run():
+        single_flight = SingleFlight()
+
+        first, first_leads = single_flight.join("what is acne?", generate)
+        second, second_leads = single_flight.join("what is acne?", generate)
+        first_reader = asyncio.create_task(read(first))
+
+        # Late joiner arrives after some tokens were produced
+        await asyncio.sleep(0.015)
+        late, late_leads = single_flight.join("what is acne?", generate)
+        answers = await asyncio.gather(first_reader, read(second), read(late))
+
+        assert (first_leads, second_leads, late_leads) == (True, False, False)
+        assert first is second is late
+        assert late.sources == [{"page": 55}]
+
+        await asyncio.sleep(0)
+        return answers, len(single_flight)
+
+    answers, in_flight = asyncio.run(run())
+
+    assert starts == ["what is acne?"]
+    assert answers == [b"Acne is common."] * 3
+    # Finished flights are not reused as a cache
+    assert in_flight == 0
+
+
+def test_subscribers_see_producer_error():
+    async def failing(flight):
+        yield b"partial"
+        raise RuntimeError("LLM down")
+
+    async def run():
+        flight, _ = SingleFlight().join("q", failing)
+        chunks = []
+        with pytest.raises(RuntimeError, match="LLM down"):
+            async for chunk in flight.subscribe():
+                chunks.append(chunk)
+        return chunks
+
+    assert asyncio.run(run()) == [b"partial"]
+
+
+def test_last_subscriber_leaving_cancels_generation():
+    closed = []
+
+    async def endless(flight):
+        try:
+            while True:
+                await asyncio.sleep(0.01)
+                yield b"token "
+        finally:
+            closed.append(True)
+
+    async def run():
+        single_flight = SingleFlight()
+        first, _ = single_flight.join("q", endless)
+        second, _ = single_flight.join("q", endless)
+        await asyncio.sleep(0.03)
+
+        single_flight.leave(first)
+        await asyncio.sleep(0.02)
+        assert not first.done
+
+        single_flight.leave(second)
+        await asyncio.sleep(0.02)
+        return first
+
+    flight = asyncio.run(run())
+
+    assert flight.done
+    assert closed == [True]
+
+
+def test_request_after_cancellation_starts_a_fresh_flight():
+    async def endless(flight):
+        while True:
+            await asyncio.sleep(0.01)
+            yield b"token "
+
+    async def answer(flight):
+        yield b"fresh"
+
+    async def run():
+        single_flight = SingleFlight()
+        dying, _ = single_flight.join("q", endless)
+        await asyncio.sleep(0.02)
+
+        # Arrives before the cancelled task has finished unwinding
+        single_flight.leave(dying)
+        fresh, leader = single_flight.join("q", answer)
+        return leader, fresh is dying, b"".join([c async for c in fresh.subscribe()])
+
+    assert asyncio.run(run()) == (True, False, b"fresh")